@@ -1,26 +1,42 @@
 #!/usr/bin/env python3
 import argparse
+import bisect
 import traceback
 import difflib
 import fcntl
+import gzip
 import hashlib
+import heapq
 import html
+import http.cookiejar
 import json
+import logging
+import logging.handlers
+import multiprocessing
 import os
 import re
 import shutil
+import signal
 import smtplib
 import sys
 import tempfile
+import threading
 import time
 import requests
-from collections import Counter
+from requests.adapters import HTTPAdapter
+from collections import Counter, defaultdict
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime, timedelta
 from email.mime.text import MIMEText
-from urllib.parse import quote
+from urllib.parse import quote, urlsplit
 
 from bs4 import BeautifulSoup, Comment
-from openai import OpenAI
+from openai import APIConnectionError, OpenAI
+try:
+    import lxml.html
+    LXML_AVAILABLE = True
+except ImportError:
+    LXML_AVAILABLE = False
 try:
     import anthropic
     ANTHROPIC_AVAILABLE = True
@@ -36,6 +52,141 @@ CONFIG_FILE = 'config.json'
 MIN_SCORE = 7
 CRON_LOCK_FILE = '.gptcron.lock'
 
+# Parsed config.json / apikey.txt keyed by path, and LLM clients keyed by provider.
+_file_cache = {}
+_llm_clients = {}
+_llm_clients_lock = threading.Lock()
+
+# On-disk LLM response cache (one JSON file per request). Entries expire after
+# the TTL and the least recently used are evicted beyond the entry cap; both are
+# overridable with "llm_cache_ttl_seconds" / "llm_cache_max_entries" in config.json.
+LLM_CACHE_DIR = 'llm_cache'
+LLM_CACHE_TTL_SECONDS = 7 * 24 * 3600
+LLM_CACHE_MAX_ENTRIES = 500
+_llm_cache_stats = Counter()
+_llm_cache_stats_lock = threading.Lock()
+_llm_cache_evict_lock = threading.Lock()
+_llm_usage_totals = Counter()
+_llm_usage_lock = threading.Lock()
+
+# Every LLM request appends one JSON line here (job, model, tokens, seconds,
+# retries); `stats` reports from it. Prices for the cost column come from
+# "llm_prices" in config.json: {"model prefix": [input, output, cache write,
+# cache read]} in dollars per million tokens, missing cache prices = input.
+LLM_METRICS_FILE = 'llm_metrics.jsonl'
+_llm_metrics_lock = threading.Lock()
+# Transient provider errors (rate limits, overload, dropped connections) are
+# retried here rather than inside the SDK clients, so the retries are counted.
+LLM_MAX_RETRIES = 2
+LLM_RETRY_BACKOFF_SECONDS = 1
+LLM_RETRY_MAX_DELAY_SECONDS = 60
+STATS_DEFAULT_DAYS = 7
+
+# Per-job stage timings for the current run (download and extract are timed
+# on fetch threads, the rest on the main thread). Each run_due_jobs call
+# appends one summary line to RUN_REPORTS_FILE; `run-report` prints them.
+TRACE_STAGES = ('download', 'extract', 'diff', 'summarize', 'email')
+RUN_REPORTS_FILE = 'run_reports.jsonl'
+RUN_REPORT_SLOWEST_JOBS = 10
+_job_timings = {}
+_job_timings_lock = threading.Lock()
+
+# Batch summaries (config "llm_batch": true): change summaries for these
+# frequencies are queued during a run, submitted to the provider's batch API at
+# the end of it, and collected and finished (score, email, baseline) on a later run.
+BATCH_FREQUENCIES = ['weekly', 'monthly']
+LLM_BATCH_DIR = 'llm_batches'
+LLM_BATCH_POLL_SECONDS = 900
+
+# Fetch stage limits for check_cron: total concurrent downloads, and how many
+# of those may hit the same host at once.
+FETCH_WORKERS = 8
+FETCH_WORKERS_PER_HOST = 2
+
+# One keep-alive session shared by every page fetch. Connection pools are kept
+# for up to HTTP_POOL_HOSTS hosts, each holding FETCH_WORKERS_PER_HOST sockets.
+USER_AGENT = 'Mozilla/5.0 (X11; Linux x86_64; rv:152.0) Gecko/20100101 Firefox/152.0'
+HTTP_TIMEOUT = 30
+HTTP_POOL_HOSTS = 64
+_http_session = None
+_http_session_lock = threading.Lock()
+
+# Visible-text extraction backend: 'auto' (lxml when installed), 'lxml' or
+# 'html.parser'. Overridable with "html_parser" in config.json.
+HTML_PARSER_BACKENDS = ['auto', 'lxml', 'html.parser']
+NON_VISIBLE_TAGS = ['script', 'style', 'noscript', 'template']
+_html_parser_backend = None
+
+# Line diff engine for compare_files: 'hashed' (patience anchors + bounded Myers
+# over integer line ids) or 'difflib' (the original difflib.Differ path).
+# Overridable with "diff_engine" in config.json.
+DIFF_ENGINES = ['hashed', 'difflib']
+MYERS_MAX_EDITS = 1000
+_diff_engine = None
+
+# Dynamic-token normalizers applied to visible lines before diffing, as
+# (name, pattern, replacement, flags). Masked lines only decide which lines
+# count as unchanged; diffs and prompts keep the page's own text. Disable with
+# "normalize_builtin": false; add per-job rules under "normalize_rules" ("*"
+# applies to every job). Times and dates are only masked after an "Updated"-
+# style label, since opening hours or event dates are real changes.
+DYNAMIC_TIME_LABEL = r'\b((?:last\s+)?(?:updated|modified|refreshed|generated|fetched|retrieved|as of)(?:\s+(?:at|on))?:?\s*)'
+DYNAMIC_TOKEN_RULES = [
+    ('iso_timestamp', DYNAMIC_TIME_LABEL + r'\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}(?::\d{2}(?:\.\d+)?)?(?:Z|[+-]\d{2}:?\d{2})?', r'\1<timestamp>', re.IGNORECASE),
+    ('clock_time', DYNAMIC_TIME_LABEL + r'\d{1,2}:\d{2}(?::\d{2})?(?:\s?[ap]\.?m\b\.?)?', r'\1<time>', re.IGNORECASE),
+    ('relative_time', r'\b(?:\d+|an?|one)\s+(?:second|sec|minute|min|hour|hr|day|week|month|year)s?\s+ago\b', '<time ago>', re.IGNORECASE),
+    ('counter', r'\b\d[\d,.]*[km]?(?=\s+(?:views?|reads?|plays?|visitors?|watching|online|comments?|likes?|shares?)\b)', '<count>', re.IGNORECASE),
+    ('session_token', r'\b((?:csrf|xsrf)[-_]?token|authenticity_token|nonce|session_?id|sid|phpsessid|jsessionid)(\s*[=:]\s*)[\w\-.%+/]+', r'\1\2<token>', re.IGNORECASE),
+    ('cache_buster', r'([?&](?:v|ver|version|_|t|ts|cb|cachebust(?:er)?|rnd|rand|timestamp)=)[\w.\-]+', r'\1<cachebust>', re.IGNORECASE),
+    ('hex_token', r'\b[0-9a-f]{24,}\b', '<token>', re.IGNORECASE),
+]
+NORMALIZER_STATS_FILE = 'normalizer_stats.json'
+
+# Learned volatile lines, kept per job in volatility/<name>.json (outside
+# data/<name>/ so writing it never invalidates the snapshot catalog). A line
+# that has flipped in or out of the page at least VOLATILE_MIN_FLIPS times, in
+# at least VOLATILE_FLIP_RATIO of the snapshot transitions since it was first
+# seen, is left out of the diff sent for summarizing. Lines that stay put for
+# VOLATILE_WINDOW transitions are forgotten.
+VOLATILITY_DIR = 'volatility'
+VOLATILE_MIN_FLIPS = 4
+VOLATILE_FLIP_RATIO = 0.3
+VOLATILE_WINDOW = 50
+VOLATILE_BOOTSTRAP_SNAPSHOTS = 20
+
+# Daemon mode: wake at least this often to notice .gptcron edits, and retry a
+# job whose run left it still due after this long (or its own interval if shorter).
+DAEMON_POLL_SECONDS = 60
+DAEMON_RETRY_SECONDS = 900
+
+# Optional process pool for HTML extraction and diffing (check_cron --cpu-pool).
+# Diffs are started as soon as a download lands, keyed by (baseline, latest).
+_cpu_pool = None
+_prepared_diffs = {}
+
+# During check_cron, job emails go through one background sender thread so
+# fetching and diffing carry on, and one authenticated SMTP session is reused
+# for the whole run (reopened if the server drops it). Metadata updates from
+# the sender and the main loop are serialized by _metadata_lock.
+SMTP_SERVER = "smtp.gmail.com"
+SMTP_PORT = 587
+SMTP_TIMEOUT = 30
+_mail_queue = None
+_smtp_session = None
+_smtp_session_lock = threading.Lock()
+_metadata_lock = threading.RLock()
+
+# A rendered job email is written to OUTBOX_DIR/<job>.json before it is sent
+# and removed once it has gone out, together with moving the job's baseline.
+# Failed sends stay there and are retried by later runs with a doubling
+# delay, and the job is not diffed or summarized again until then. After
+# OUTBOX_MAX_ATTEMPTS the email is dropped; the baseline stays put, so the
+# job's next change is diffed against the last email that did go out.
+OUTBOX_DIR = 'outbox'
+OUTBOX_RETRY_SECONDS = 900
+OUTBOX_MAX_RETRY_SECONDS = 6 * 3600
+OUTBOX_MAX_ATTEMPTS = 10
+
 VALID_FREQUENCIES = ['minutely', 'hourly', 'daily', 'weekly', 'monthly']
 
 # Model configuration - defaults can be overridden in config.json
@@ -44,6 +195,18 @@ FALLBACK_MODEL = "gpt-4o"
 MODEL = DEFAULT_MODEL  # Legacy variable for backward compatibility
 
 LOG_FILE = 'log.log'
+# log.log is written through a buffer that is flushed every LOG_BUFFER_RECORDS
+# messages, at the end of each run and on errors. It rotates at "log_max_bytes",
+# or on a "log_rotate_when" schedule such as "midnight", keeping
+# "log_backup_count" old files, gzipped unless "log_compress" is false.
+LOG_MAX_BYTES = 10 * 1024 * 1024
+LOG_BACKUP_COUNT = 5
+LOG_BUFFER_RECORDS = 200
+_logger = logging.getLogger('gptcron')
+_logger.propagate = False
+_logger.setLevel(logging.INFO)
+_log_handler = None
+_log_handler_lock = threading.RLock()
 
 
 class EmailDeliveryError(RuntimeError):
@@ -196,13 +359,24 @@ summary_email_body_template="""<html>
 
 
 
+def load_cached_file(path, parse):
+    # Parsed once per process and re-read only when the file changes, so a
+    # long-running daemon picks up edits without re-reading on every call.
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+    stamp = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+    cached = _file_cache.get(path)
+    if cached is None or cached[0] != stamp:
+        with open(path, 'r') as f:
+            cached = (stamp, parse(f))
+        _file_cache[path] = cached
+    return cached[1]
+
 def load_config():
-    with open(CONFIG_FILE, 'r') as f:
-        return json.load(f)
+    return dict(load_cached_file(CONFIG_FILE, json.load))
 
 def load_apikey():
-    with open(API_KEY_FILE, 'r') as f:
-        return f.read().strip()
+    return load_cached_file(API_KEY_FILE, lambda f: f.read().strip())
 
 
 def get_model_config():
@@ -221,6 +395,23 @@ def get_model_config():
     }
 
 
+def get_llm_client(provider, api_key, max_retries=None):
+    # One client per provider (and retry setting), reused across calls so its
+    # HTTP pool stays warm; rebuilt only if the configured key changes.
+    # max_retries=None keeps the SDK's own retries.
+    options = {} if max_retries is None else {'max_retries': max_retries}
+    with _llm_clients_lock:
+        cached = _llm_clients.get((provider, max_retries))
+        if cached is None or cached[0] != api_key:
+            if provider == 'anthropic':
+                client = anthropic.Anthropic(api_key=api_key, **options)
+            else:
+                client = OpenAI(api_key=api_key, **options)
+            cached = (api_key, client)
+            _llm_clients[(provider, max_retries)] = cached
+        return cached[1]
+
+
 def get_model_provider(model):
     model_name = model.lower()
     if 'claude' in model_name:
@@ -230,87 +421,435 @@ def get_model_provider(model):
     raise ValueError(f"Unsupported model '{model}'. Use a Claude, GPT, or OpenAI o-series model.")
 
 
-def call_llm(prompt, system_prompt="You are a helpful assistant.", max_tokens=4096, response_format=None, model=None):
+def get_llm_cache_key(provider, model, system_prompt, prompt, response_format, max_tokens):
+    request = json.dumps(
+        [provider, model, system_prompt, prompt, response_format, max_tokens],
+        sort_keys=True
+    )
+    return hashlib.sha256(request.encode('utf-8')).hexdigest()
+
+
+def get_llm_cache_limits():
+    config = load_optional_config()
+    return (
+        config.get('llm_cache_ttl_seconds', LLM_CACHE_TTL_SECONDS),
+        config.get('llm_cache_max_entries', LLM_CACHE_MAX_ENTRIES)
+    )
+
+
+def count_llm_cache(*events):
+    with _llm_cache_stats_lock:
+        _llm_cache_stats.update(events)
+
+
+def read_llm_cache(cache_key, cache_check):
+    path = os.path.join(LLM_CACHE_DIR, f"{cache_key}.json")
+    ttl_seconds, _ = get_llm_cache_limits()
+    try:
+        with open(path, 'r', encoding='utf-8') as cache_file:
+            entry = json.load(cache_file)
+    except FileNotFoundError:
+        count_llm_cache('misses')
+        return None
+    except (OSError, json.JSONDecodeError):
+        entry = None
+    if not entry or time.time() - entry.get('created', 0) > ttl_seconds or not cache_check(entry.get('response')):
+        count_llm_cache('misses', 'discarded')
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        return None
+    # The file mtime is the LRU clock; the entry may have just been evicted.
+    try:
+        os.utime(path)
+    except FileNotFoundError:
+        pass
+    count_llm_cache('hits')
+    return entry['response']
+
+
+def write_llm_cache(cache_key, model, response_text):
+    _, max_entries = get_llm_cache_limits()
+    path = os.path.join(LLM_CACHE_DIR, f"{cache_key}.json")
+    atomic_write_text(path, json.dumps({'created': time.time(), 'model': model, 'response': response_text}))
+    # One evictor per process; entries can still vanish under another process.
+    with _llm_cache_evict_lock:
+        entries = []
+        for filename in os.listdir(LLM_CACHE_DIR):
+            if not filename.endswith('.json'):
+                continue
+            entry_path = os.path.join(LLM_CACHE_DIR, filename)
+            try:
+                entries.append((os.stat(entry_path).st_mtime, entry_path))
+            except FileNotFoundError:
+                continue
+        if len(entries) > max_entries:
+            entries.sort()
+            for _, entry_path in entries[:len(entries) - max_entries]:
+                try:
+                    os.remove(entry_path)
+                    count_llm_cache('evicted')
+                except FileNotFoundError:
+                    pass
+
+
+def is_conforming_response(response_text):
+    response_json, got = attempt_to_deserialize_openai_json(response_text)
+    return got and check_conformity(response_json)
+
+
+def get_provider_client(provider, config, max_retries=None):
+    if provider == 'anthropic':
+        if not ANTHROPIC_AVAILABLE:
+            raise Exception("Anthropic package not installed. Run: pip install anthropic")
+        if not config['anthropic_api_key']:
+            raise Exception("Anthropic API key not found in config.json")
+        return get_llm_client('anthropic', config['anthropic_api_key'], max_retries)
+    if not config['openai_api_key']:
+        raise Exception("OpenAI API key not found in config.json or apikey.txt")
+    return get_llm_client('openai', config['openai_api_key'], max_retries)
+
+
+def build_anthropic_request(model_name, prompt, system_prompt, max_tokens, response_format, cache_system_prompt=False):
+    # Claude doesn't support response_format parameter directly
+    if response_format and response_format.get('type') == 'json_object':
+        prompt_with_json = f"{prompt}\n\nIMPORTANT: Respond ONLY with valid JSON. No other text."
+    else:
+        prompt_with_json = prompt
+    if cache_system_prompt:
+        system_prompt = [{"type": "text", "text": system_prompt, "cache_control": {"type": "ephemeral"}}]
+    return {
+        'model': model_name,
+        'max_tokens': max_tokens,
+        'system': system_prompt,
+        'messages': [{"role": "user", "content": prompt_with_json}]
+    }
+
+
+def build_openai_request(model_name, prompt, system_prompt, max_tokens, response_format):
+    is_reasoning_model = model_name.lower().startswith(('o1', 'o3', 'o4'))
+    if is_reasoning_model:
+        messages = [{
+            "role": "user",
+            "content": f"{system_prompt}\n\n{prompt}"
+        }]
+    else:
+        messages = [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": prompt}
+        ]
+    kwargs = {
+        'model': model_name,
+        'messages': messages
+    }
+    if is_reasoning_model:
+        kwargs['max_completion_tokens'] = max_tokens
+    else:
+        kwargs['max_tokens'] = max_tokens
+
+    if response_format:
+        kwargs['response_format'] = response_format
+    return kwargs
+
+
+def get_usage_count(usage, *path):
+    # Token counts are missing or None on some models and SDK versions
+    for attribute in path:
+        usage = getattr(usage, attribute, None)
+    return usage if isinstance(usage, int) else 0
+
+
+def record_llm_usage(provider, model_name, response):
+    usage = getattr(response, 'usage', None)
+    if provider == 'anthropic':
+        counts = {
+            'input': get_usage_count(usage, 'input_tokens'),
+            'output': get_usage_count(usage, 'output_tokens'),
+            'cache_write': get_usage_count(usage, 'cache_creation_input_tokens'),
+            'cache_read': get_usage_count(usage, 'cache_read_input_tokens'),
+        }
+    else:
+        # OpenAI counts cached tokens inside prompt_tokens and never bills writes
+        cached = get_usage_count(usage, 'prompt_tokens_details', 'cached_tokens')
+        counts = {
+            'input': get_usage_count(usage, 'prompt_tokens') - cached,
+            'output': get_usage_count(usage, 'completion_tokens'),
+            'cache_write': 0,
+            'cache_read': cached,
+        }
+    with _llm_usage_lock:
+        _llm_usage_totals['calls'] += 1
+        _llm_usage_totals.update(counts)
+    log_message(
+        f"LLM usage for {model_name}: {counts['input']} input, {counts['output']} output, "
+        f"{counts['cache_write']} cache write, {counts['cache_read']} cache read token(s)"
+    )
+    return counts
+
+
+def is_transient_llm_error(error):
+    status_code = getattr(error, 'status_code', None)
+    if isinstance(status_code, int):
+        return status_code in (408, 409, 429) or status_code >= 500
+    connection_errors = (APIConnectionError, anthropic.APIConnectionError) if ANTHROPIC_AVAILABLE else (APIConnectionError,)
+    return isinstance(error, connection_errors)
+
+
+def get_llm_retry_delay(error, retries):
+    headers = getattr(getattr(error, 'response', None), 'headers', None) or {}
+    try:
+        delay = float(headers.get('retry-after'))
+    except (TypeError, ValueError):
+        delay = LLM_RETRY_BACKOFF_SECONDS * 2 ** (retries - 1)
+    return min(max(delay, 0), LLM_RETRY_MAX_DELAY_SECONDS)
+
+
+def record_llm_metrics(job, provider, model_name, usage, seconds, retries, ok):
+    usage = usage or {}
+    entry = {
+        'time': round(time.time()),
+        'job': job,
+        'provider': provider,
+        'model': model_name,
+        'input': usage.get('input', 0),
+        'output': usage.get('output', 0),
+        'cache_write': usage.get('cache_write', 0),
+        'cache_read': usage.get('cache_read', 0),
+        'seconds': round(seconds, 3),
+        'retries': retries,
+        'ok': ok
+    }
+    line = json.dumps(entry, separators=(',', ':')) + '\n'
+    try:
+        with _llm_metrics_lock, open(LLM_METRICS_FILE, 'a', encoding='utf-8') as f:
+            f.write(line)
+    except OSError as e:
+        log_message(f"Could not record LLM metrics: {str(e)}")
+
+
+def call_llm(prompt, system_prompt="You are a helpful assistant.", max_tokens=4096, response_format=None, model=None, cache_check=None, cache_system_prompt=False, job=None):
     config = get_model_config()
 
     if model is None:
         model = config['default_model']
 
-    def try_call(model_name):
-        provider = get_model_provider(model_name)
+    def request_once(model_name, provider, outcome):
+        # call_llm retries transient errors itself so it can count them; the
+        # batch API calls use the default client and keep the SDK's retries.
+        client = get_provider_client(provider, config, max_retries=0)
         if provider == 'anthropic':
-            if not ANTHROPIC_AVAILABLE:
-                raise Exception("Anthropic package not installed. Run: pip install anthropic")
-            if not config['anthropic_api_key']:
-                raise Exception("Anthropic API key not found in config.json")
-
-            client = anthropic.Anthropic(api_key=config['anthropic_api_key'])
-
-            # Claude doesn't support response_format parameter directly
-            if response_format and response_format.get('type') == 'json_object':
-                prompt_with_json = f"{prompt}\n\nIMPORTANT: Respond ONLY with valid JSON. No other text."
-            else:
-                prompt_with_json = prompt
-
             response = client.messages.create(
-                model=model_name,
-                max_tokens=max_tokens,
-                system=system_prompt,
-                messages=[{"role": "user", "content": prompt_with_json}]
+                **build_anthropic_request(
+                    model_name, prompt, system_prompt, max_tokens, response_format, cache_system_prompt
+                )
             )
+            outcome['usage'] = record_llm_usage(provider, model_name, response)
             if not response.content:
                 raise RuntimeError("Anthropic returned an empty response")
             return response.content[0].text
         else:
-            if not config['openai_api_key']:
-                raise Exception("OpenAI API key not found in config.json or apikey.txt")
-
-            client = OpenAI(api_key=config['openai_api_key'])
-
-            is_reasoning_model = model_name.lower().startswith(('o1', 'o3', 'o4'))
-            if is_reasoning_model:
-                messages = [{
-                    "role": "user",
-                    "content": f"{system_prompt}\n\n{prompt}"
-                }]
-            else:
-                messages = [
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": prompt}
-                ]
-            kwargs = {
-                'model': model_name,
-                'messages': messages
-            }
-            if is_reasoning_model:
-                kwargs['max_completion_tokens'] = max_tokens
-            else:
-                kwargs['max_tokens'] = max_tokens
-
-            if response_format:
-                kwargs['response_format'] = response_format
-
-            response = client.chat.completions.create(**kwargs)
+            response = client.chat.completions.create(
+                **build_openai_request(model_name, prompt, system_prompt, max_tokens, response_format)
+            )
+            outcome['usage'] = record_llm_usage(provider, model_name, response)
             content = response.choices[0].message.content
             if not content:
                 raise RuntimeError("OpenAI returned an empty response")
             return content.strip()
 
+    def try_call(model_name):
+        provider = get_model_provider(model_name)
+        outcome = {}
+        retries = 0
+        started = time.monotonic()
+        try:
+            while True:
+                try:
+                    response_text = request_once(model_name, provider, outcome)
+                    outcome['ok'] = True
+                    return response_text
+                except Exception as e:
+                    if retries >= LLM_MAX_RETRIES or not is_transient_llm_error(e):
+                        raise
+                    retries += 1
+                    delay = get_llm_retry_delay(e, retries)
+                    log_message(f"Transient {model_name} error ({str(e)}); retry {retries} of {LLM_MAX_RETRIES} in {delay:.1f}s")
+                    time.sleep(delay)
+        finally:
+            record_llm_metrics(
+                job, provider, model_name, outcome.get('usage'),
+                time.monotonic() - started, retries, outcome.get('ok', False)
+            )
+
     # Anti-fallback (mybrowser 00-absolute-rules): there is only the primary
     # path. A model failure raises loudly at the point of failure — we never
     # silently substitute a different model. Fix the real cause (key, model
     # slug, provider outage) instead. `fallback_model` in config is unused.
-    return try_call(model)
+    if cache_check is None:
+        return try_call(model)
+
+    # Only callers that can validate a stored answer opt into the cache, and
+    # only answers that pass that validation are stored.
+    cache_key = get_llm_cache_key(
+        get_model_provider(model), model, system_prompt, prompt, response_format, max_tokens
+    )
+    cached_response = read_llm_cache(cache_key, cache_check)
+    if cached_response is not None:
+        log_message(f"LLM cache hit for {model} ({cache_key[:12]})")
+        return cached_response
+    response_text = try_call(model)
+    if cache_check(response_text):
+        # The answer is already paid for; a cache problem must not lose it.
+        try:
+            write_llm_cache(cache_key, model, response_text)
+        except OSError as e:
+            log_message(f"Could not write LLM cache entry {cache_key[:12]}: {str(e)}")
+    return response_text
+
+
+def load_llm_metrics(since):
+    entries = []
+    if not os.path.exists(LLM_METRICS_FILE):
+        return entries
+    with open(LLM_METRICS_FILE, encoding='utf-8') as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue  # a line cut short by a crash
+            if isinstance(entry, dict) and entry.get('time', 0) >= since:
+                entries.append(entry)
+    return entries
+
+
+def get_llm_price(model, prices):
+    # Longest matching prefix wins; None when the model has no configured price
+    matches = [prefix for prefix in prices if model.lower().startswith(prefix.lower())]
+    if not matches:
+        return None
+    price = list(prices[max(matches, key=len)])
+    price += [price[0]] * (4 - len(price))
+    return price
+
+
+def get_llm_cost(entry, prices):
+    price = get_llm_price(entry['model'], prices)
+    if price is None:
+        return None
+    tokens = (entry['input'], entry['output'], entry['cache_write'], entry['cache_read'])
+    return sum(count * rate for count, rate in zip(tokens, price)) / 1e6
+
+
+def get_percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def show_llm_stats(days=STATS_DEFAULT_DAYS, job=None):
+    entries = load_llm_metrics(time.time() - days * 86400)
+    if job:
+        entries = [entry for entry in entries if entry.get('job') == job]
+    if not entries:
+        print(f"No LLM requests recorded in the last {days:g} day(s).")
+        return
+    prices = load_optional_config().get('llm_prices', {})
+
+    def print_table(title, key):
+        groups = defaultdict(list)
+        for entry in entries:
+            groups[entry.get(key) or '-'].append(entry)
+        rows = []
+        for name, group in groups.items():
+            costs = [get_llm_cost(entry, prices) for entry in group]
+            rows.append((
+                name, len(group), sum(entry['retries'] for entry in group),
+                sum(not entry['ok'] for entry in group),
+                sum(entry['input'] + entry['cache_write'] + entry['cache_read'] for entry in group),
+                sum(entry['cache_read'] for entry in group),
+                sum(entry['output'] for entry in group),
+                None if None in costs else sum(costs),
+                sum(entry['seconds'] for entry in group),
+                get_percentile([entry['seconds'] for entry in group], 0.5),
+                get_percentile([entry['seconds'] for entry in group], 0.95)
+            ))
+        rows.sort(key=lambda row: (-(row[7] or 0), -(row[4] + row[6]), row[0]))
+        print(f"\n{title}")
+        print(f"  {'':<32} {'calls':>6} {'retry':>5} {'fail':>4} {'input':>10} {'cached':>10} {'output':>9} {'cost $':>8} {'time s':>8} {'p50 s':>7} {'p95 s':>7}")
+        for name, calls, retries, failures, input_tokens, cached, output_tokens, cost, seconds, p50, p95 in rows:
+            cost_text = '?' if cost is None else f"{cost:.2f}"
+            print(
+                f"  {name[:32]:<32} {calls:>6} {retries:>5} {failures:>4} {input_tokens:>10} {cached:>10} "
+                f"{output_tokens:>9} {cost_text:>8} {seconds:>8.1f} {p50:>7.2f} {p95:>7.2f}"
+            )
 
-def log_message(message):
+    print(f"LLM requests in the last {days:g} day(s): {len(entries)}")
+    print_table("By job:", 'job')
+    print_table("By model:", 'model')
+
+def compress_rotated_log(source, destination):
+    with open(source, 'rb') as source_file, gzip.open(destination, 'wb') as destination_file:
+        shutil.copyfileobj(source_file, destination_file)
+    os.remove(source)
+
+
+def get_log_handler():
+    global _log_handler
+    with _log_handler_lock:
+        if _log_handler is None:
+            try:
+                config = load_optional_config()
+            except Exception:
+                config = {}
+            backup_count = config.get('log_backup_count', LOG_BACKUP_COUNT)
+            if config.get('log_rotate_when'):
+                target = logging.handlers.TimedRotatingFileHandler(
+                    LOG_FILE, when=config['log_rotate_when'], backupCount=backup_count,
+                    encoding='utf-8', delay=True
+                )
+            else:
+                target = logging.handlers.RotatingFileHandler(
+                    LOG_FILE, maxBytes=config.get('log_max_bytes', LOG_MAX_BYTES), backupCount=backup_count,
+                    encoding='utf-8', delay=True
+                )
+            if config.get('log_compress', True):
+                target.namer = lambda name: name + '.gz'
+                target.rotator = compress_rotated_log
+            target.setFormatter(logging.Formatter('%(message)s'))
+            _log_handler = logging.handlers.MemoryHandler(
+                LOG_BUFFER_RECORDS, flushLevel=logging.ERROR, target=target
+            )
+            _logger.addHandler(_log_handler)
+        return _log_handler
+
+
+def flush_log():
+    with _log_handler_lock:
+        if _log_handler is not None:
+            _log_handler.flush()
+
+
+def close_log():
+    global _log_handler
+    with _log_handler_lock:
+        if _log_handler is not None:
+            target = _log_handler.target
+            _logger.removeHandler(_log_handler)
+            _log_handler.close()
+            target.close()
+            _log_handler = None
+
+
+def log_message(message, error=False):
     msg = f"{datetime.now().strftime('%Y-%m-%d %H:%M:%S')} - {message}"
     try:
         print(msg)
     except Exception:
         pass
     try:
-        with open(LOG_FILE, 'a') as log_file:
-            log_file.write(msg+'\n')
+        get_log_handler()
+        # ERROR records flush the buffer straight away
+        _logger.log(logging.ERROR if error else logging.INFO, msg)
     except Exception as e:
         try:
             print(f"Could not write to {LOG_FILE}: {str(e)}")
@@ -327,6 +866,17 @@ def save_metadata(metadata):
     atomic_write_text('job_metadata.json', json.dumps(metadata))
 
 
+def update_job_metadata(name, update):
+    with _metadata_lock:
+        metadata = load_metadata()
+        update(metadata.setdefault(name, {}))
+        save_metadata(metadata)
+
+
+def set_last_emailed_version(name, latest_file):
+    update_job_metadata(name, lambda job_state: job_state.update(last_emailed_version=latest_file))
+
+
 def atomic_write_text(path, content):
     directory = os.path.dirname(os.path.abspath(path))
     os.makedirs(directory, exist_ok=True)
@@ -413,6 +963,7 @@ def setup_argparse():
 
     check_parser = subparsers.add_parser('check_cron', help='Check and run all scheduled cron jobs.')
     check_parser.add_argument('force', type=str, nargs='?', choices=['force'], help='Run every job even when it is not due.')
+    check_parser.add_argument('--cpu-pool', action='store_true', help='Extract and diff pages in a process pool sized to the CPU count.')
 
     list_parser = subparsers.add_parser('list', help='List all monitoring jobs.')
     list_parser.add_argument('--sort_by', choices=['date', 'url', 'name'], help='Sort jobs by date, url, or name')
@@ -444,6 +995,22 @@ def setup_argparse():
     test_parser = subparsers.add_parser('test', help='Test a job by forcing a comparison. Usage: test [job_name]')
     test_parser.add_argument('name', type=str, nargs='?', help='Name of the job to test (optional)')
 
+    daemon_parser = subparsers.add_parser('daemon', help='Run continuously, checking each job when it is due and reloading .gptcron when it changes.')
+    daemon_parser.add_argument('--cpu-pool', action='store_true', help='Extract and diff pages in a process pool sized to the CPU count.')
+
+    pack_parser = subparsers.add_parser('pack_snapshots', help='Move legacy .html snapshots into the compressed snapshot store. Usage: pack_snapshots [name]')
+    pack_parser.add_argument('name', type=str, nargs='?', help='Only pack this job (default: all jobs)')
+
+    run_report_parser = subparsers.add_parser('run-report', help='Show stage timings and the slowest jobs of recent check_cron runs. Usage: run-report [--last N]')
+    run_report_parser.add_argument('--last', type=int, default=1, help='Number of most recent runs to show (default 1)')
+
+    stats_parser = subparsers.add_parser('stats', help='Report LLM requests, tokens, cost and latency per job and per model. Usage: stats [--days N] [--job name]')
+    stats_parser.add_argument('--days', type=float, default=STATS_DEFAULT_DAYS, help=f'Report on the last N days (default {STATS_DEFAULT_DAYS})')
+    stats_parser.add_argument('--job', type=str, help='Only report requests made for this job')
+
+    volatile_parser = subparsers.add_parser('inspect_volatile', help='List lines left out of diffs because they keep flipping in and out of a page. Usage: inspect_volatile [name]')
+    volatile_parser.add_argument('name', type=str, nargs='?', help='Job to inspect (default: all jobs)')
+
     compare_wikis_parser = subparsers.add_parser('compare_wikis', help='Compare Grokipedia and Wikipedia pages for a given subject. Usage: compare_wikis <subject>')
     compare_wikis_parser.add_argument('subject', type=str, help='Subject/topic to compare between Grokipedia and Wikipedia')
     compare_wikis_parser.add_argument('--send-email', action='store_true', help='Send results via email instead of printing to console')
@@ -478,9 +1045,7 @@ def test_job(name=None):
 
 def fetch_page_content(url):
     try:
-        user_agent = 'Mozilla/5.0 (X11; Linux x86_64; rv:152.0) Gecko/20100101 Firefox/152.0'
-        headers = {'User-Agent': user_agent}
-        response = requests.get(url, headers=headers, timeout=30)
+        response = http_get(url)
         response.raise_for_status()
         return response.text
     except requests.exceptions.RequestException as e:
@@ -766,35 +1331,353 @@ def check_conformity(response_json):
     return True
 
 
-def summarize_diff(diff_text, all_text, html_content, url, name):
-    context_text = extract_text_from_html(html_content)
-
-    loaded_prompt = outer_prompt
-
-    prompt = f"""{loaded_prompt}
+# Prompt budgets for summarize_diff, in estimated tokens (about CHARS_PER_TOKEN
+# characters each), by full match on the model name, so newer families such as
+# gpt-4.1 get the default rather than legacy GPT-4's; overridable with
+# "prompt_token_budget".
+# The diff gets PROMPT_DIFF_SHARE of what the instructions leave, and page context
+# the rest: the first PROMPT_PAGE_HEAD_LINES lines, then PROMPT_CONTEXT_RADIUS
+# lines either side of each changed hunk. Configured budgets below
+# MIN_PROMPT_TOKEN_BUDGET are rejected, and at least PROMPT_MIN_FREE_TOKENS are
+# always left after the instructions so diffs and merges keep making progress.
+PROMPT_TOKEN_BUDGETS = [(r'gpt-4(?:-\d{4})?', 4000)]
+DEFAULT_PROMPT_TOKEN_BUDGET = 16000
+MIN_PROMPT_TOKEN_BUDGET = 1000
+PROMPT_MIN_FREE_TOKENS = 256
+CHARS_PER_TOKEN = 4
+PROMPT_DIFF_SHARE = 0.75
+PROMPT_CONTEXT_RADIUS = 3
+PROMPT_PAGE_HEAD_LINES = 5
+
+# The rating rubric is the same for every diff, so it travels in the system
+# prompt, behind a cache_control marker on Anthropic. Providers only cache a
+# prefix over the model's minimum (1024 tokens on Sonnet and OpenAI), which
+# this rubric does not reach yet.
+DIFF_SUMMARY_SYSTEM_PROMPT = "You are a helpful assistant that returns JSON responses.\n" + outer_prompt
+# Diffs that do not fit one prompt are summarized in parts by this many
+# concurrent calls, then merged; "diff_map_reduce": false sends one trimmed prompt.
+MAP_REDUCE_WORKERS = 4
+DIFF_SUMMARY_MAX_TOKENS = 3500
+
+
+def estimate_tokens(text):
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def get_prompt_token_budget(model):
+    configured = load_optional_config().get('prompt_token_budget')
+    if configured:
+        if configured < MIN_PROMPT_TOKEN_BUDGET:
+            raise ValueError(
+                f"Invalid prompt_token_budget {configured} in {CONFIG_FILE}; "
+                f"use at least {MIN_PROMPT_TOKEN_BUDGET} tokens, the instructions alone take about 500"
+            )
+        return configured
+    model_name = model.lower()
+    for pattern, budget in PROMPT_TOKEN_BUDGETS:
+        if re.fullmatch(pattern, model_name):
+            return budget
+    return DEFAULT_PROMPT_TOKEN_BUDGET
+
+
+def split_diff_hunks(diff_lines, positions):
+    # Each diff block lists its REMOVED lines before its ADDED ones, so a hunk
+    # ends where a REMOVED line follows an ADDED one, or where the next ADDED
+    # line is not the next line on the page.
+    hunks = []
+    previous_kind = None
+    previous_position = None
+    for line in diff_lines:
+        kind = 'ADDED' if line.startswith('ADDED: ') else 'REMOVED'
+        position = positions.get(line[len('ADDED: '):]) if kind == 'ADDED' else None
+        if (
+            not hunks
+            or (kind == 'REMOVED' and previous_kind == 'ADDED')
+            or (position is not None and previous_position is not None and position != previous_position + 1)
+        ):
+            hunks.append([])
+        hunks[-1].append((line, position))
+        previous_kind = kind
+        if position is not None:
+            previous_position = position
+    return hunks
+
+
+def render_diff_summary_prompt(url, context_text, diff_section, part=None):
+    part_note = ''
+    if part:
+        part_note = (
+            f"\n        This change was too large for one request, so it was split at hunk boundaries. "
+            f"This is part {part[0]} of {part[1]}; summarize and score only the lines below.\n"
+        )
+    return f"""
         Page URL: {url}
-
-        Current page context:
+{part_note}
+        Current page context (the top of the page, then the lines around each change; "..." marks skipped lines):
         ============
-        {context_text[:12000]}
+        {context_text}
         ============
 
         Here is the full list of all lines added or removed in this time interval.  Your summary is relating to what the addition or removal of this content means; your summary is NOT about the lines that remained unchanged:
         ============
 
-        {diff_text[:50000]}
+        {diff_section}
 
         ============
 
     """
 
+
+def get_prompt_char_budgets(url, part=None):
+    # (token budget, characters left after the instructions, characters for the diff)
+    budget = get_prompt_token_budget(load_optional_config().get('default_model', DEFAULT_MODEL))
+    instructions = DIFF_SUMMARY_SYSTEM_PROMPT + render_diff_summary_prompt(url, '', '', part)
+    available_chars = max(PROMPT_MIN_FREE_TOKENS, budget - estimate_tokens(instructions)) * CHARS_PER_TOKEN
+    return budget, available_chars, int(available_chars * PROMPT_DIFF_SHARE)
+
+
+def get_line_positions(page_lines):
+    positions = {}
+    for index, line in enumerate(page_lines):
+        positions.setdefault(line, index)
+    return positions
+
+
+def split_diff_into_chunks(diff_text, page_lines, chunk_chars):
+    # Page-ordered chunks that each fit chunk_chars, breaking between hunks
+    # where possible and inside a hunk only when it is bigger than a chunk.
+    chunks = []
+    current = []
+    current_size = 0
+    for hunk in split_diff_hunks(diff_text.split('\r\n'), get_line_positions(page_lines)):
+        hunk_size = sum(len(line) + 2 for line, _ in hunk)
+        if current and current_size + hunk_size > chunk_chars:
+            chunks.append(current)
+            current = []
+            current_size = 0
+        for line, _ in hunk:
+            if current and current_size + len(line) + 2 > chunk_chars:
+                chunks.append(current)
+                current = []
+                current_size = 0
+            current.append(line)
+            current_size += len(line) + 2
+    if current:
+        chunks.append(current)
+    return ['\r\n'.join(chunk) for chunk in chunks]
+
+
+def build_diff_summary_prompt(diff_text, document, url, part=None):
+    page_lines = document['lines']
+    budget, available_chars, diff_chars = get_prompt_char_budgets(url, part)
+
+    # The diff gets its share first, biggest hunks first, then is emitted in page order.
+    hunks = split_diff_hunks(diff_text.split('\r\n'), get_line_positions(page_lines))
+    hunk_sizes = [sum(len(line) + 2 for line, _ in hunk) for hunk in hunks]
+    by_size = sorted(range(len(hunks)), key=lambda index: -hunk_sizes[index])
+    chosen = set()
+    used_chars = 0
+    omitted_lines = 0
+    for index in by_size:
+        if used_chars + hunk_sizes[index] <= diff_chars:
+            chosen.add(index)
+            used_chars += hunk_sizes[index]
+        elif not chosen:
+            kept = []
+            for line, position in hunks[index]:
+                if used_chars + len(line) + 2 > diff_chars:
+                    break
+                kept.append((line, position))
+                used_chars += len(line) + 2
+            omitted_lines += len(hunks[index]) - len(kept)
+            hunks[index] = kept
+            chosen.add(index)
+        else:
+            omitted_lines += len(hunks[index])
+    diff_lines = [line for index in sorted(chosen) for line, _ in hunks[index]]
+    if omitted_lines:
+        diff_lines.append(f"[{omitted_lines} more changed line(s) omitted to fit the prompt budget]")
+
+    # Context fills what is left: the page head, then windows around the
+    # chosen hunks in the same size order.
+    wanted = list(range(min(PROMPT_PAGE_HEAD_LINES, len(page_lines))))
+    for index in by_size:
+        anchored = [position for _, position in hunks[index] if position is not None]
+        if index in chosen and anchored:
+            wanted.extend(range(
+                max(0, min(anchored) - PROMPT_CONTEXT_RADIUS),
+                min(len(page_lines), max(anchored) + PROMPT_CONTEXT_RADIUS + 1)
+            ))
+    context_chars = available_chars - used_chars
+    selected = set()
+    for line_index in wanted:
+        if line_index in selected:
+            continue
+        cost = len(page_lines[line_index]) + 1
+        if cost > context_chars:
+            break
+        selected.add(line_index)
+        context_chars -= cost
+    context_lines = []
+    previous_index = -1
+    for line_index in sorted(selected):
+        if line_index != previous_index + 1:
+            context_lines.append('...')
+        context_lines.append(page_lines[line_index])
+        previous_index = line_index
+    if previous_index != len(page_lines) - 1 and context_lines:
+        context_lines.append('...')
+
+    prompt = render_diff_summary_prompt(url, '\n'.join(context_lines), '\r\n'.join(diff_lines), part)
+    log_message(
+        f"Change-summary prompt for {url}: ~{estimate_tokens(prompt)} tokens of a {budget}-token budget "
+        f"({len(chosen)} of {len(hunks)} hunk(s), {len(selected)} context line(s))"
+    )
+    return prompt
+
+
+def get_diff_summary_chunks(diff_text, document, url):
+    if not load_optional_config().get('diff_map_reduce', True):
+        return [diff_text]
+    page_lines = document['lines']
+    _, _, diff_chars = get_prompt_char_budgets(url, (1, 1))
+    # Leave room for longer part numbers in the note than "1 of 1".
+    return split_diff_into_chunks(diff_text, page_lines, diff_chars - 8 * CHARS_PER_TOKEN)
+
+
+def summarize_diff(diff_text, all_text, document, url, name):
+    chunks = get_diff_summary_chunks(diff_text, document, url)
+    if len(chunks) > 1:
+        return summarize_diff_in_parts(chunks, document, url, name)
+
+    prompt = build_diff_summary_prompt(diff_text, document, url)
+
     response_text = call_llm(
         prompt=prompt,
-        system_prompt="You are a helpful assistant that returns JSON responses.",
+        system_prompt=DIFF_SUMMARY_SYSTEM_PROMPT,
         response_format={"type": "json_object"},
-        max_tokens=3500
+        max_tokens=DIFF_SUMMARY_MAX_TOKENS,
+        cache_check=is_conforming_response,
+        cache_system_prompt=True,
+        job=name
     )
+    return parse_diff_summary(response_text, prompt, url, name)
+
+
+def summarize_diff_in_parts(chunks, document, url, name):
+    # Map: every chunk is summarized concurrently; reduce: the part summaries
+    # are merged within the token budget, usually by one more call.
+    log_message(f"Diff for job {name} is too large for one prompt; summarizing it in {len(chunks)} parts")
+
+    def summarize_part(part_number, chunk):
+        prompt = build_diff_summary_prompt(chunk, document, url, (part_number, len(chunks)))
+        response_text = call_llm(
+            prompt=prompt,
+            system_prompt=DIFF_SUMMARY_SYSTEM_PROMPT,
+            response_format={"type": "json_object"},
+            max_tokens=DIFF_SUMMARY_MAX_TOKENS,
+            cache_check=is_conforming_response,
+            cache_system_prompt=True,
+            job=name
+        )
+        return parse_diff_summary(response_text, prompt, url, f"{name}_part{part_number}")
+
+    with ThreadPoolExecutor(max_workers=min(MAP_REDUCE_WORKERS, len(chunks)), thread_name_prefix='summarize') as executor:
+        futures = [
+            executor.submit(summarize_part, part_number, chunk)
+            for part_number, chunk in enumerate(chunks, start=1)
+        ]
+        parts = [future.result() for future in futures]
+    return merge_diff_summaries(parts, url, name)
 
+
+def render_merge_prompt(url, part_count, part_sections):
+    return f"""
+        Page URL: {url}
+
+        This page changed too much to review in one request, so its added and removed lines were split into {part_count} parts and each part was summarized separately. Merge the part summaries below into one summary of the whole change, in the output format from your instructions. Keep every significant detail, and score the change as a whole: at least as high as its most significant part.
+
+{part_sections}
+        ============
+
+    """
+
+
+def format_merge_section(part_number, part_count, part, section_chars):
+    # Trimmed to section_chars so any two sections fit one merge prompt.
+    summary, score, brief_summary = part
+    section = f"""        ============
+        Part {part_number} of {part_count} (score {score}): {brief_summary}
+        {summary}"""
+    if len(section) > section_chars:
+        note = "\n        [trimmed to fit the prompt budget]"
+        section = section[:max(0, section_chars - len(note))] + note
+    return section
+
+
+def group_merge_parts(section_sizes, available_chars):
+    # Consecutive part indices whose sections fit one prompt together
+    groups = []
+    current = []
+    current_size = 0
+    for index, size in enumerate(section_sizes):
+        if current and current_size + size + 1 > available_chars:
+            groups.append(current)
+            current = []
+            current_size = 0
+        current.append(index)
+        current_size += size + 1
+    if current:
+        groups.append(current)
+    return groups
+
+
+def merge_diff_summaries(parts, url, name):
+    # Reduce: part summaries are merged in as few prompts as the token budget
+    # allows. If they do not all fit one prompt, groups are merged separately
+    # and the results merged again, round after round, until one is left.
+    budget, _, _ = get_prompt_char_budgets(url)
+    instructions = DIFF_SUMMARY_SYSTEM_PROMPT + render_merge_prompt(url, len(parts), '')
+    available_chars = max(PROMPT_MIN_FREE_TOKENS, budget - estimate_tokens(instructions)) * CHARS_PER_TOKEN
+    section_chars = available_chars // 2 - 1
+    merge_round = 0
+    while True:
+        merge_round += 1
+        groups = group_merge_parts(
+            [len(format_merge_section(number, len(parts), part, section_chars)) for number, part in enumerate(parts, start=1)],
+            available_chars
+        )
+        if len(groups) > 1:
+            log_message(f"Part summaries for job {name} exceed one prompt; merging them in {len(groups)} groups (round {merge_round})")
+
+        def merge_group(group_number, group):
+            if len(groups) > 1 and len(group) == 1:
+                return parts[group[0]]
+            sections = [
+                format_merge_section(number, len(group), parts[index], section_chars)
+                for number, index in enumerate(group, start=1)
+            ]
+            prompt = render_merge_prompt(url, len(group), '\n'.join(sections))
+            response_text = call_llm(
+                prompt=prompt,
+                system_prompt=DIFF_SUMMARY_SYSTEM_PROMPT,
+                response_format={"type": "json_object"},
+                max_tokens=DIFF_SUMMARY_MAX_TOKENS,
+                cache_check=is_conforming_response,
+                cache_system_prompt=True,
+                job=name
+            )
+            label = name if len(groups) == 1 else f"{name}_merge{merge_round}_{group_number}"
+            return parse_diff_summary(response_text, prompt, url, label)
+
+        with ThreadPoolExecutor(max_workers=min(MAP_REDUCE_WORKERS, len(groups)), thread_name_prefix='summarize') as executor:
+            futures = [executor.submit(merge_group, number, group) for number, group in enumerate(groups, start=1)]
+            parts = [future.result() for future in futures]
+        if len(parts) == 1:
+            return parts[0]
+
+
+def parse_diff_summary(response_text, prompt, url, name):
     unique_id = f"{datetime.now().strftime('%Y%m%d%H%M%S%f')}_{hashlib.md5(url.encode()).hexdigest()}"
     os.makedirs('openai_responses', exist_ok=True)
     response_json, got = attempt_to_deserialize_openai_json(response_text)
@@ -850,15 +1733,15 @@ def create_email_content(job_name, url, brief_summary, summary, diff_text, score
     formatted_summary = summary.replace('\n', '<br>')
     subject = f"gpt-diff | {job_name} | Score: {score} | {brief_summary}"
 
-    current_date = datetime.fromtimestamp(os.path.getmtime(current_file)).strftime('%Y-%m-%d %H:%M:%S')
+    current_date = get_snapshot_time(current_file).strftime('%Y-%m-%d %H:%M:%S')
 
     if len(compared_files) == 2:
-        old_date = datetime.fromtimestamp(os.path.getmtime(compared_files[0])).strftime('%Y-%m-%d %H:%M:%S')
+        old_date = get_snapshot_time(compared_files[0]).strftime('%Y-%m-%d %H:%M:%S')
         comparison_info = f"<p>Comparing current version (downloaded on {current_date}) with previous version (downloaded on {old_date}).</p>"
     else:
         comparison_info = f"<p>Comparing current version (downloaded on {current_date}) with multiple previous versions:</p><ul class='comparison-list'>"
         for file in compared_files:
-            file_date = datetime.fromtimestamp(os.path.getmtime(file)).strftime('%Y-%m-%d %H:%M:%S')
+            file_date = get_snapshot_time(file).strftime('%Y-%m-%d %H:%M:%S')
             comparison_info += f"<li>Version downloaded on {file_date}</li>"
         comparison_info += "</ul>"
 
@@ -884,7 +1767,11 @@ def create_summary_email_content(job_name, url, brief_summary, summary):
 
 def send_email(job_name, subject, body, to_email):
     log_message(f"Sending Email: Subject: {subject}, Body: {body[:1000]}...")
-    inner_send_email(subject, body, to_email)
+    started = time.monotonic()
+    try:
+        inner_send_email(subject, body, to_email)
+    finally:
+        record_job_timing(job_name, 'email', time.monotonic() - started)
     try:
         save_email_to_disk(job_name, subject, body)
     except Exception as e:
@@ -895,33 +1782,175 @@ def send_email(job_name, subject, body, to_email):
     except Exception:
         pass
 
+def open_smtp_session(config):
+    server = smtplib.SMTP(SMTP_SERVER, SMTP_PORT, timeout=SMTP_TIMEOUT)
+    try:
+        server.starttls()
+        server.login(config['login_email'], config['password'])
+    except BaseException:
+        server.close()
+        raise
+    return server
+
+
+def discard_smtp_session():
+    # Caller holds _smtp_session_lock
+    global _smtp_session
+    if _smtp_session is not None:
+        try:
+            _smtp_session.quit()
+        except Exception as e:
+            log_message(f"SMTP cleanup failed: {str(e)}")
+            _smtp_session.close()
+        _smtp_session = None
+
+
+def close_smtp_session():
+    with _smtp_session_lock:
+        discard_smtp_session()
+
+
 def inner_send_email(subject, body, to_email):
+    global _smtp_session
     config = load_config()
     msg = MIMEText(body, 'html')
     msg['Subject'] = subject
     msg['From'] = config['from_email']
     msg['To'] = to_email
-    smtp_server = "smtp.gmail.com"
-    smtp_port = 587
-    smtp_user = config['login_email']
-    smtp_password = config['password']
 
-    server = None
-    try:
-        server = smtplib.SMTP(smtp_server, smtp_port, timeout=30)
-        server.starttls()
-        server.login(smtp_user, smtp_password)
-        server.sendmail(smtp_user, [to_email], msg.as_string())
-    except Exception as e:
-        print(f"Failed to send email: {e}")
-        log_message(f"Failed to send email to {to_email}: {e}")
-        raise EmailDeliveryError(f"Failed to send email to {to_email}") from e
-    finally:
-        if server is not None:
+    with _smtp_session_lock:
+        while True:
+            reused = _smtp_session is not None
             try:
-                server.quit()
+                if _smtp_session is None:
+                    _smtp_session = open_smtp_session(config)
+                _smtp_session.sendmail(config['login_email'], [to_email], msg.as_string())
+                return
             except Exception as e:
-                log_message(f"SMTP cleanup failed after delivery attempt: {str(e)}")
+                discard_smtp_session()
+                if reused:
+                    # The server may have dropped an idle session; retry once on a fresh one.
+                    log_message(f"SMTP session failed ({str(e)}); reconnecting")
+                    continue
+                print(f"Failed to send email: {e}")
+                log_message(f"Failed to send email to {to_email}: {e}")
+                raise EmailDeliveryError(f"Failed to send email to {to_email}") from e
+
+
+def start_mail_queue():
+    global _mail_queue
+    if _mail_queue is None:
+        _mail_queue = ThreadPoolExecutor(max_workers=1, thread_name_prefix='mail')
+    return _mail_queue
+
+
+def stop_mail_queue():
+    global _mail_queue
+    if _mail_queue is not None:
+        _mail_queue.shutdown(wait=True)
+        _mail_queue = None
+
+
+def get_outbox_path(name):
+    return os.path.join(OUTBOX_DIR, f"{name}.json")
+
+
+def has_pending_outbox_email(name):
+    return os.path.exists(get_outbox_path(name))
+
+
+def get_outbox_retry_delay(attempts):
+    return min(OUTBOX_RETRY_SECONDS * 2 ** (attempts - 1), OUTBOX_MAX_RETRY_SECONDS)
+
+
+def send_outbox_email(path, entry):
+    try:
+        send_email(entry['name'], entry['subject'], entry['body'], entry['to_email'])
+    except EmailDeliveryError:
+        entry['attempts'] += 1
+        if entry['attempts'] >= OUTBOX_MAX_ATTEMPTS:
+            os.remove(path)
+            log_message(
+                f"Giving up on the email for job {entry['name']} after {entry['attempts']} failed attempts: "
+                f"{entry['subject']}", error=True
+            )
+            raise
+        entry['next_attempt'] = time.time() + get_outbox_retry_delay(entry['attempts'])
+        atomic_write_text(path, json.dumps(entry))
+        raise
+    set_last_emailed_version(entry['name'], entry['latest_file'])
+    os.remove(path)
+
+
+def send_outbox_emails():
+    # Retries emails that failed on earlier runs; returns (sent, failed).
+    sent = 0
+    failed = 0
+    now = time.time()
+    for path in list_json_files(OUTBOX_DIR):
+        try:
+            entry = load_json_file(path)
+            due = entry['next_attempt'] <= now
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            # Set aside, so it neither blocks the job nor fails every run.
+            log_message(f"Unreadable outbox entry {path} ({str(e)}); moved to {path}.bad", error=True)
+            os.replace(path, path + '.bad')
+            continue
+        if not due:
+            continue
+        try:
+            send_outbox_email(path, entry)
+            sent += 1
+            log_message(f"Sent outbox email for job {entry['name']} after {entry['attempts']} failed attempt(s)")
+        except EmailDeliveryError as e:
+            failed += 1
+            if os.path.exists(path):
+                log_message(
+                    f"Outbox email for job {entry['name']} failed again ({str(e)}); "
+                    f"next attempt in {get_outbox_retry_delay(entry['attempts']) // 60} minute(s)"
+                )
+            # The mail server is likely still down; leave the rest for later.
+            break
+        except Exception as e:
+            log_message(f"Unexpected error sending outbox email for job {entry.get('name')}: {str(e)}")
+            log_message(traceback.format_exc(), error=True)
+    return sent, failed
+
+
+def retry_outbox_emails():
+    try:
+        return send_outbox_emails()
+    except Exception as e:
+        log_message(f"Outbox retry failed: {str(e)} - will retry next run")
+        log_message(traceback.format_exc(), error=True)
+        return 0, 0
+
+
+def deliver_job_email(job_name, subject, body, to_email, latest_file):
+    # True once sent, or a Future resolving to True while the mail queue runs.
+    # The baseline only moves to latest_file after the email has gone out; a
+    # failed send raises EmailDeliveryError and leaves the email in the outbox.
+    path = get_outbox_path(job_name)
+    entry = {
+        'name': job_name,
+        'subject': subject,
+        'body': body,
+        'to_email': to_email,
+        'latest_file': latest_file,
+        'attempts': 0,
+        'next_attempt': 0,
+        'queued': time.time()
+    }
+    atomic_write_text(path, json.dumps(entry))
+
+    def deliver():
+        send_outbox_email(path, entry)
+        return True
+
+    if _mail_queue is None:
+        return deliver()
+    log_message(f"Queued email for job {job_name}")
+    return _mail_queue.submit(deliver)
 
 
 
@@ -930,19 +1959,65 @@ def extract_text_from_html(html_content):
     return ' '.join(extract_visible_lines_from_html(html_content))
 
 
-def extract_visible_lines_from_html(html_content):
-    soup = BeautifulSoup(html_content, 'html.parser')
-    for element in soup(['script', 'style', 'noscript', 'template']):
-        element.decompose()
-    for comment in soup.find_all(string=lambda text: isinstance(text, Comment)):
-        comment.extract()
+def load_optional_config():
+    if not os.path.exists(CONFIG_FILE):
+        return {}
+    return load_config()
+
+
+def get_html_parser_backend():
+    global _html_parser_backend
+    if _html_parser_backend is None:
+        configured = load_optional_config().get('html_parser', 'auto')
+        if configured not in HTML_PARSER_BACKENDS:
+            raise ValueError(f"Invalid html_parser '{configured}' in {CONFIG_FILE}; use one of {', '.join(HTML_PARSER_BACKENDS)}")
+        if configured == 'lxml' and not LXML_AVAILABLE:
+            log_message("html_parser is set to lxml but lxml is not installed; using html.parser.")
+            configured = 'html.parser'
+        if configured == 'auto':
+            configured = 'lxml' if LXML_AVAILABLE else 'html.parser'
+        _html_parser_backend = configured
+    return _html_parser_backend
+
+
+def normalize_visible_lines(text_chunks):
     lines = []
-    for line in soup.get_text(separator='\n').splitlines():
+    for line in '\n'.join(text_chunks).splitlines():
         normalized_line = ' '.join(line.split())
         if normalized_line:
             lines.append(normalized_line)
     return lines
 
+
+def extract_visible_lines_with_html_parser(html_content):
+    soup = BeautifulSoup(html_content, 'html.parser')
+    for element in soup(NON_VISIBLE_TAGS):
+        element.decompose()
+    for comment in soup.find_all(string=lambda text: isinstance(text, Comment)):
+        comment.extract()
+    return normalize_visible_lines([soup.get_text(separator='\n')])
+
+
+def extract_visible_lines_with_lxml(html_content):
+    if not html_content.strip():
+        return []
+    document = lxml.html.document_fromstring(html_content)
+    for element in list(document.iter(*NON_VISIBLE_TAGS)):
+        element.drop_tree()
+    # itertext skips comment bodies but keeps their tails, like the html.parser path.
+    return normalize_visible_lines(document.itertext())
+
+
+def extract_visible_lines_from_html(html_content, backend=None):
+    backend = backend or get_html_parser_backend()
+    if backend == 'lxml':
+        try:
+            return extract_visible_lines_with_lxml(html_content)
+        except (ValueError, lxml.etree.ParserError):
+            # e.g. str input with an XML encoding declaration; html.parser copes.
+            pass
+    return extract_visible_lines_with_html_parser(html_content)
+
 def debug_json_parsing(job_name):
     job_dir = "openai_responses"
     if not os.path.exists(job_dir):
@@ -983,7 +2058,9 @@ def summarize_page(context_text, url, name, job):
         prompt=prompt,
         system_prompt="You are a helpful assistant which always returns JSON.",
         response_format={"type": "json_object"},
-        max_tokens=3500
+        max_tokens=3500,
+        cache_check=is_conforming_response,
+        job=name
     )
     unique_id = f"{datetime.now().strftime('%Y%m%d%H%M%S%f')}_{hashlib.md5(url.encode()).hexdigest()}"
     os.makedirs('openai_responses', exist_ok=True)
@@ -1030,63 +2107,508 @@ def backup_cron_file():
     log_message(f"Backup created: {backup_file}")
 
 
-def get_snapshot_versions(name):
-    job_dir = f"data/{name}"
-    if not os.path.exists(job_dir):
-        return []
+# Snapshots live in a per-job content-addressed store: data/<name>/blobs holds
+# gzip-compressed HTML keyed by sha256, and data/<name>/manifest.jsonl maps each
+# snapshot (still addressed by its historical data/<name>/<name>-<time>.html
+# path) to a blob. Plain .html files from before the store remain readable.
+#
+# The manifest is also the job's snapshot index (time, file, size, blob and
+# visible-content hash). It is loaded once per process and revalidated with a
+# stat of the job directory and manifest. Legacy .html files are indexed with
+# blob None whenever the directory mtime differs from the last recorded scan.
+SNAPSHOT_MANIFEST = 'manifest.jsonl'
+SNAPSHOT_BLOB_DIR = 'blobs'
+_snapshot_catalogs = {}
+
 
-    snapshots = []
+def parse_snapshot_time(name, filename):
     formats = [
         f"{name}-%Y%m%d-%H-%M-%S-%f.html",
         f"{name}-%Y%m%d-%H-%M-%S.html"
     ]
-    for filename in os.listdir(job_dir):
-        path = os.path.join(job_dir, filename)
-        if not os.path.isfile(path):
+    for filename_format in formats:
+        try:
+            return datetime.strptime(filename, filename_format)
+        except ValueError:
             continue
-        snapshot_time = None
-        for filename_format in formats:
-            try:
-                snapshot_time = datetime.strptime(filename, filename_format)
-                break
-            except ValueError:
-                continue
-        if snapshot_time is not None:
-            snapshots.append((snapshot_time, path))
-    snapshots.sort(key=lambda snapshot: snapshot[0])
-    return snapshots
+    return None
 
 
-def get_last_file(name):
-    snapshots = get_snapshot_versions(name)
-    if snapshots:
-        snapshot_time, last_file = snapshots[-1]
-        return last_file, snapshot_time.timestamp()
-    return None, None
+def get_blob_path(job_dir, blob_hash):
+    return os.path.join(job_dir, SNAPSHOT_BLOB_DIR, f"{blob_hash}.html.gz")
 
 
-#returns changed / new lines, and all text subsequently.
-def compare_files(html1, html2):
-    def extract_text(html_file):
-        with open(html_file, 'r', encoding='utf-8') as f:
-            return extract_visible_lines_from_html(f.read())
+def get_lines_path(job_dir, blob_hash):
+    # Cached lines are per extraction backend so switching parsers never mixes outputs.
+    if get_html_parser_backend() == 'html.parser':
+        return os.path.join(job_dir, SNAPSHOT_BLOB_DIR, f"{blob_hash}.lines.gz")
+    return os.path.join(job_dir, SNAPSHOT_BLOB_DIR, f"{blob_hash}.{get_html_parser_backend()}.lines.gz")
 
-    old_lines = extract_text(html1)
-    new_lines = extract_text(html2)
-    differ = difflib.Differ()
 
-    diff = differ.compare(old_lines, new_lines)
-    diff_lines=[]
-    all_lines=[]
-    for line in diff:
-        if not line[2:].strip():
-            continue
-        content = line[2:].strip()
-        all_lines.append(content)
+def write_blob_file(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temporary_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temporary_path, 'wb') as blob:
+        blob.write(gzip.compress(data, compresslevel=6))
+    os.replace(temporary_path, path)
 
-        if line.startswith('  '):
-            pass
+
+def read_snapshot_manifest(job_dir):
+    manifest_path = os.path.join(job_dir, SNAPSHOT_MANIFEST)
+    entries = {}
+    legacy_scan = None
+    if not os.path.exists(manifest_path):
+        return entries, legacy_scan
+    with open(manifest_path, 'r', encoding='utf-8') as manifest:
+        for line in manifest:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if 'legacy_scan' in record:
+                legacy_scan = record['legacy_scan']
+            else:
+                entries[record['file']] = record
+    return entries, legacy_scan
+
+
+def append_manifest_records(job_dir, records):
+    with open(os.path.join(job_dir, SNAPSHOT_MANIFEST), 'a', encoding='utf-8') as manifest:
+        for record in records:
+            manifest.write(json.dumps(record) + '\n')
+        manifest.flush()
+        os.fsync(manifest.fileno())
+
+
+def get_catalog_stamp(job_dir):
+    try:
+        directory_mtime = os.stat(job_dir).st_mtime_ns
+    except FileNotFoundError:
+        return None
+    try:
+        manifest_stat = os.stat(os.path.join(job_dir, SNAPSHOT_MANIFEST))
+        return directory_mtime, manifest_stat.st_mtime_ns, manifest_stat.st_size
+    except FileNotFoundError:
+        return directory_mtime, None, None
+
+
+def mark_legacy_scanned(job_dir):
+    # Appending to a new manifest creates it and bumps the directory mtime, so
+    # record the mtime again once the file exists.
+    for _ in range(2):
+        directory_mtime = os.stat(job_dir).st_mtime_ns
+        append_manifest_records(job_dir, [{'legacy_scan': directory_mtime}])
+        if os.stat(job_dir).st_mtime_ns == directory_mtime:
+            return
+
+
+def scan_legacy_snapshots(job_dir, entries):
+    name = os.path.basename(job_dir)
+    legacy_files = set()
+    added = []
+    for filename in os.listdir(job_dir):
+        path = os.path.join(job_dir, filename)
+        if not os.path.isfile(path):
+            continue
+        entry = entries.get(filename)
+        if entry is not None and entry['blob'] is not None:
+            continue
+        snapshot_time = parse_snapshot_time(name, filename)
+        if snapshot_time is None:
+            continue
+        legacy_files.add(filename)
+        if entry is None:
+            entry = {'file': filename, 'time': snapshot_time.timestamp(), 'blob': None, 'size': os.path.getsize(path)}
+            entries[filename] = entry
+            added.append(entry)
+    vanished = [
+        filename for filename, entry in entries.items()
+        if entry['blob'] is None and filename not in legacy_files
+    ]
+    if vanished:
+        for filename in vanished:
+            del entries[filename]
+        atomic_write_text(
+            os.path.join(job_dir, SNAPSHOT_MANIFEST),
+            ''.join(json.dumps(entry) + '\n' for entry in entries.values())
+        )
+    elif added:
+        append_manifest_records(job_dir, added)
+    mark_legacy_scanned(job_dir)
+
+
+def load_snapshot_catalog(job_dir):
+    job_dir = os.path.abspath(job_dir)
+    stamp = get_catalog_stamp(job_dir)
+    catalog = _snapshot_catalogs.get(job_dir)
+    if catalog is not None and catalog['stamp'] == stamp:
+        return catalog
+    entries = {}
+    if stamp is not None:
+        entries, legacy_scan = read_snapshot_manifest(job_dir)
+        if legacy_scan != stamp[0]:
+            scan_legacy_snapshots(job_dir, entries)
+            stamp = get_catalog_stamp(job_dir)
+    ordered = sorted(entries.values(), key=lambda entry: entry['time'])
+    catalog = {
+        'stamp': stamp,
+        'by_file': entries,
+        'ordered': ordered,
+        'times': [entry['time'] for entry in ordered]
+    }
+    _snapshot_catalogs[job_dir] = catalog
+    return catalog
+
+
+def find_snapshot_entry(path):
+    return load_snapshot_catalog(os.path.dirname(path))['by_file'].get(os.path.basename(path))
+
+
+def get_snapshot_time(path):
+    entry = find_snapshot_entry(path)
+    if entry is not None:
+        return datetime.fromtimestamp(entry['time'])
+    job_dir = os.path.dirname(path)
+    snapshot_time = parse_snapshot_time(os.path.basename(job_dir), os.path.basename(path))
+    if snapshot_time is None:
+        return datetime.fromtimestamp(os.path.getmtime(path))
+    return snapshot_time
+
+
+def save_snapshot(path, content, lines=None):
+    job_dir = os.path.dirname(path)
+    catalog = load_snapshot_catalog(job_dir)
+    data = content.encode('utf-8')
+    blob_hash = hashlib.sha256(data).hexdigest()
+    blob_path = get_blob_path(job_dir, blob_hash)
+    if not os.path.exists(blob_path):
+        write_blob_file(blob_path, data)
+    if lines is not None and not os.path.exists(get_lines_path(job_dir, blob_hash)):
+        write_blob_file(get_lines_path(job_dir, blob_hash), '\n'.join(lines).encode('utf-8'))
+    filename = os.path.basename(path)
+    snapshot_time = parse_snapshot_time(os.path.basename(os.path.normpath(job_dir)), filename)
+    entry = {
+        'file': filename,
+        'time': (snapshot_time or datetime.now()).timestamp(),
+        'blob': blob_hash,
+        'size': len(data),
+        'content_hash': hash_visible_lines(lines) if lines is not None else None
+    }
+    append_manifest_records(job_dir, [entry])
+    if catalog['stamp'] is None or get_catalog_stamp(job_dir)[0] != catalog['stamp'][0]:
+        # The first blob or manifest write changed the directory; this process
+        # just indexed it, so record that no legacy rescan is needed.
+        mark_legacy_scanned(job_dir)
+
+    replaced = catalog['by_file'].get(filename)
+    catalog['by_file'][filename] = entry
+    if replaced is not None:
+        catalog['ordered'] = sorted(catalog['by_file'].values(), key=lambda item: item['time'])
+        catalog['times'] = [item['time'] for item in catalog['ordered']]
+    else:
+        position = bisect.bisect_right(catalog['times'], entry['time'])
+        catalog['times'].insert(position, entry['time'])
+        catalog['ordered'].insert(position, entry)
+    catalog['stamp'] = get_catalog_stamp(job_dir)
+    return path
+
+
+def read_snapshot(path):
+    entry = find_snapshot_entry(path)
+    if entry is not None and entry['blob'] is not None:
+        with open(get_blob_path(os.path.dirname(path), entry['blob']), 'rb') as blob:
+            return gzip.decompress(blob.read()).decode('utf-8')
+    if os.path.isfile(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return f.read()
+    raise FileNotFoundError(f"No snapshot stored for {path}")
+
+
+# Visible lines are cached per blob as <hash>.lines.gz, so a baseline that sits
+# unchanged for weeks is parsed once, not on every run.
+def get_snapshot_lines(path):
+    job_dir = os.path.dirname(path)
+    content = None
+    entry = find_snapshot_entry(path)
+    if entry is not None and entry['blob'] is not None:
+        blob_hash = entry['blob']
+    else:
+        content = read_snapshot(path)
+        blob_hash = hashlib.sha256(content.encode('utf-8')).hexdigest()
+    lines_path = get_lines_path(job_dir, blob_hash)
+    if os.path.exists(lines_path):
+        with open(lines_path, 'rb') as cached:
+            text = gzip.decompress(cached.read()).decode('utf-8')
+        return text.split('\n') if text else []
+    if content is None:
+        content = read_snapshot(path)
+    lines = extract_visible_lines_from_html(content)
+    write_blob_file(lines_path, '\n'.join(lines).encode('utf-8'))
+    return lines
+
+
+def get_snapshot_size(path):
+    entry = find_snapshot_entry(path)
+    if entry is not None:
+        return entry['size']
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    raise FileNotFoundError(f"No snapshot stored for {path}")
+
+
+# The parsed form of one snapshot, built once per run from the cached lines and
+# handed to compare, summarize and the first-run summary instead of raw HTML.
+def load_snapshot_document(path):
+    lines = get_snapshot_lines(path)
+    return {
+        'path': path,
+        'lines': lines,
+        'text': ' '.join(lines),
+        'size': get_snapshot_size(path)
+    }
+
+
+def snapshot_exists(path):
+    entry = find_snapshot_entry(path)
+    if entry is not None and entry['blob'] is not None:
+        return True
+    return os.path.isfile(path)
+
+
+def delete_snapshot(path):
+    if os.path.isfile(path):
+        os.remove(path)
+        return
+    job_dir = os.path.dirname(path)
+    entries, _ = read_snapshot_manifest(job_dir)
+    entry = entries.pop(os.path.basename(path), None)
+    if entry is None:
+        return
+    atomic_write_text(
+        os.path.join(job_dir, SNAPSHOT_MANIFEST),
+        ''.join(json.dumps(remaining) + '\n' for remaining in entries.values())
+    )
+    mark_legacy_scanned(job_dir)
+    if not any(remaining['blob'] == entry['blob'] for remaining in entries.values()):
+        blob_dir = os.path.join(job_dir, SNAPSHOT_BLOB_DIR)
+        for filename in os.listdir(blob_dir):
+            if filename.startswith(f"{entry['blob']}."):
+                os.remove(os.path.join(blob_dir, filename))
+
+
+def pack_snapshots(name=None):
+    names = [name] if name else [job['name'] for job in parse_cron_file()]
+    for job_name in names:
+        job_dir = f"data/{job_name}"
+        if not os.path.isdir(job_dir):
+            continue
+        packed = 0
+        for entry in list(load_snapshot_catalog(job_dir)['ordered']):
+            path = os.path.join(job_dir, entry['file'])
+            if entry['blob'] is not None or not os.path.isfile(path):
+                continue
+            with open(path, 'r', encoding='utf-8') as f:
+                content = f.read()
+            # Record the blob before removing the file so a crash never loses a snapshot.
+            save_snapshot(path, content)
+            os.remove(path)
+            packed += 1
+        print(f"{job_name}: packed {packed} snapshot(s)")
+        log_message(f"Packed {packed} legacy snapshot(s) for job {job_name}")
+
+
+def get_snapshot_versions(name):
+    job_dir = f"data/{name}"
+    return [
+        (datetime.fromtimestamp(entry['time']), os.path.join(job_dir, entry['file']))
+        for entry in load_snapshot_catalog(job_dir)['ordered']
+    ]
+
+
+def get_last_file(name):
+    ordered = load_snapshot_catalog(f"data/{name}")['ordered']
+    if ordered:
+        return os.path.join(f"data/{name}", ordered[-1]['file']), ordered[-1]['time']
+    return None, None
+
+
+def get_oldest_snapshot(name, exclude=None):
+    for entry in load_snapshot_catalog(f"data/{name}")['ordered']:
+        path = os.path.join(f"data/{name}", entry['file'])
+        if path != exclude:
+            return path
+    return None
+
+
+def get_diff_engine():
+    global _diff_engine
+    if _diff_engine is None:
+        configured = load_optional_config().get('diff_engine', 'hashed')
+        if configured not in DIFF_ENGINES:
+            raise ValueError(f"Invalid diff_engine '{configured}' in {CONFIG_FILE}; use one of {', '.join(DIFF_ENGINES)}")
+        _diff_engine = configured
+    return _diff_engine
+
+
+def find_unique_anchors(a, alo, ahi, b, blo, bhi):
+    # Patience diff: lines occurring exactly once on each side, kept in the
+    # longest run that is increasing on both sides.
+    a_counts = Counter(a[alo:ahi])
+    b_positions = {}
+    for j in range(blo, bhi):
+        b_positions[b[j]] = -1 if b[j] in b_positions else j
+    candidates = [
+        (i, b_positions[a[i]]) for i in range(alo, ahi)
+        if a_counts[a[i]] == 1 and b_positions.get(a[i], -1) >= 0
+    ]
+    if not candidates:
+        return []
+    tails = []
+    tail_indexes = []
+    predecessors = [None] * len(candidates)
+    for index, (_, j) in enumerate(candidates):
+        position = bisect.bisect_left(tails, j)
+        if position:
+            predecessors[index] = tail_indexes[position - 1]
+        if position == len(tails):
+            tails.append(j)
+            tail_indexes.append(index)
+        else:
+            tails[position] = j
+            tail_indexes[position] = index
+    anchors = []
+    index = tail_indexes[-1]
+    while index is not None:
+        anchors.append(candidates[index])
+        index = predecessors[index]
+    anchors.reverse()
+    return anchors
+
+
+def match_with_myers(a, alo, ahi, b, blo, bhi, pairs):
+    while alo < ahi and blo < bhi:
+        n = ahi - alo
+        m = bhi - blo
+        max_edits = min(n + m, MYERS_MAX_EDITS)
+        offset = max_edits + 1
+        v = [0] * (2 * max_edits + 3)
+        trace = []
+        for d in range(max_edits + 1):
+            trace.append(v[:])
+            for k in range(-d, d + 1, 2):
+                if k == -d or (k != d and v[offset + k - 1] < v[offset + k + 1]):
+                    x = v[offset + k + 1]
+                else:
+                    x = v[offset + k - 1] + 1
+                y = x - k
+                while x < n and y < m and a[alo + x] == b[blo + y]:
+                    x += 1
+                    y += 1
+                v[offset + k] = x
+                if x >= n and y >= m:
+                    break
+            else:
+                continue
+            break
+        else:
+            # Too many edits to align in one pass: keep the path that got
+            # furthest within the cap and align the rest of the region from there.
+            x, y = max(
+                ((v[offset + k], v[offset + k] - k) for k in range(-max_edits, max_edits + 1, 2)
+                 if v[offset + k] <= n and 0 <= v[offset + k] - k <= m),
+                key=sum
+            )
+        end_x, end_y = x, y
+
+        for d in range(len(trace) - 1, -1, -1):
+            previous = trace[d]
+            k = x - y
+            if k == -d or (k != d and previous[offset + k - 1] < previous[offset + k + 1]):
+                previous_k = k + 1
+            else:
+                previous_k = k - 1
+            previous_x = previous[offset + previous_k]
+            previous_y = previous_x - previous_k
+            while x > previous_x and y > previous_y:
+                x -= 1
+                y -= 1
+                pairs.append((alo + x, blo + y))
+            x, y = previous_x, previous_y
+        alo += end_x
+        blo += end_y
+
+
+def diff_line_opcodes(old_lines, new_lines):
+    line_ids = {}
+    a = [line_ids.setdefault(line, len(line_ids)) for line in old_lines]
+    b = [line_ids.setdefault(line, len(line_ids)) for line in new_lines]
+
+    pairs = []
+    regions = [(0, len(a), 0, len(b))]
+    while regions:
+        alo, ahi, blo, bhi = regions.pop()
+        while alo < ahi and blo < bhi and a[alo] == b[blo]:
+            pairs.append((alo, blo))
+            alo += 1
+            blo += 1
+        while alo < ahi and blo < bhi and a[ahi - 1] == b[bhi - 1]:
+            ahi -= 1
+            bhi -= 1
+            pairs.append((ahi, bhi))
+        if alo == ahi or blo == bhi:
+            continue
+        anchors = find_unique_anchors(a, alo, ahi, b, blo, bhi)
+        if not anchors:
+            match_with_myers(a, alo, ahi, b, blo, bhi, pairs)
+            continue
+        previous_i, previous_j = alo, blo
+        for i, j in anchors:
+            regions.append((previous_i, i, previous_j, j))
+            pairs.append((i, j))
+            previous_i, previous_j = i + 1, j + 1
+        regions.append((previous_i, ahi, previous_j, bhi))
+
+    opcodes = []
+    i = j = 0
+    for pair_i, pair_j in sorted(pairs) + [(len(a), len(b))]:
+        if pair_i > i or pair_j > j:
+            tag = 'replace' if pair_i > i and pair_j > j else ('delete' if pair_i > i else 'insert')
+            opcodes.append((tag, i, pair_i, j, pair_j))
+        if pair_i == len(a) and pair_j == len(b):
+            break
+        if opcodes and opcodes[-1][0] == 'equal' and opcodes[-1][2] == pair_i and opcodes[-1][4] == pair_j:
+            opcodes[-1] = ('equal', opcodes[-1][1], pair_i + 1, opcodes[-1][3], pair_j + 1)
+        else:
+            opcodes.append(('equal', pair_i, pair_i + 1, pair_j, pair_j + 1))
+        i, j = pair_i + 1, pair_j + 1
+    return opcodes
+
+
+def diff_lines_with_difflib(old_lines, new_lines, old_keys=None, new_keys=None):
+    differ = difflib.Differ()
+
+    diff = differ.compare(old_keys or old_lines, new_keys or new_lines)
+    diff_lines=[]
+    all_lines=[]
+    i = j = 0
+    for line in diff:
+        # Map each compared (possibly masked) line back to the page's own text.
+        if line.startswith('  '):
+            content = new_lines[j].strip()
+            i += 1
+            j += 1
         elif line.startswith('- '):
+            content = old_lines[i].strip()
+            i += 1
+        elif line.startswith('+ '):
+            content = new_lines[j].strip()
+            j += 1
+        else:
+            continue
+        if not content:
+            continue
+        all_lines.append(content)
+
+        if line.startswith('- '):
             diff_lines.append(f"REMOVED: {content}")
         elif line.startswith('+ '):
             diff_lines.append(f"ADDED: {content}")
@@ -1095,26 +2617,461 @@ def compare_files(html1, html2):
     all_text= '\r\n'.join(all_lines)
     return diff_text, all_text
 
-def download_url(url, name):
+
+def diff_lines_with_hashes(old_lines, new_lines, old_keys=None, new_keys=None):
+    diff_lines = []
+    all_lines = []
+    for tag, i1, i2, j1, j2 in diff_line_opcodes(old_keys or old_lines, new_keys or new_lines):
+        if tag == 'equal':
+            all_lines.extend(new_lines[j1:j2])
+            continue
+        for line in old_lines[i1:i2]:
+            all_lines.append(line)
+            diff_lines.append(f"REMOVED: {line}")
+        for line in new_lines[j1:j2]:
+            all_lines.append(line)
+            diff_lines.append(f"ADDED: {line}")
+    return '\r\n'.join(diff_lines), '\r\n'.join(all_lines)
+
+
+def get_normalizer_rules(name):
+    config = load_optional_config()
+    rules = list(DYNAMIC_TOKEN_RULES) if config.get('normalize_builtin', True) else []
+    configured = config.get('normalize_rules', {})
+    for entry in configured.get('*', []) + configured.get(name, []):
+        if isinstance(entry, str):
+            entry = {'pattern': entry}
+        pattern = entry['pattern']
+        try:
+            re.compile(pattern)
+        except re.error as e:
+            raise ValueError(f"Invalid normalize_rules pattern {pattern!r} for job {name} in {CONFIG_FILE}: {e}")
+        rules.append((entry.get('name', pattern), pattern, entry.get('replace', '<masked>'), 0))
+    return rules
+
+
+def normalize_lines(lines, rules):
+    compiled = [(rule_name, re.compile(pattern, flags), replacement) for rule_name, pattern, replacement, flags in rules]
+    fired = Counter()
+    normalized = []
+    for line in lines:
+        for rule_name, regex, replacement in compiled:
+            line, count = regex.subn(replacement, line)
+            if count:
+                fired[rule_name] += count
+        normalized.append(line)
+    return normalized, fired
+
+
+def record_normalizer_fires(name, baseline, new_lines, fired, diff_found):
+    # A call is saved when the raw lines differ but the masked ones do not.
+    saved = not diff_found and get_snapshot_lines(baseline) != new_lines
+    stats = {}
+    if os.path.exists(NORMALIZER_STATS_FILE):
+        stats = load_json_file(NORMALIZER_STATS_FILE)
+    for rule_name, count in fired.items():
+        rule_stats = stats.setdefault(rule_name, {'fired': 0, 'saved': 0})
+        rule_stats['fired'] += count
+        if saved:
+            rule_stats['saved'] += 1
+    atomic_write_text(NORMALIZER_STATS_FILE, json.dumps(stats, indent=2, sort_keys=True))
+    if saved:
+        log_message(
+            f"Normalizers masked every change for job {name} ("
+            + ', '.join(f"{rule_name} x{count}" for rule_name, count in sorted(fired.items()))
+            + "); skipped the LLM call."
+        )
+
+
+def get_line_fingerprint(line):
+    return hashlib.sha1(line.encode('utf-8')).hexdigest()[:16]
+
+
+def update_line_volatility(state, previous_lines, current_lines):
+    previous = {get_line_fingerprint(line): line for line in previous_lines}
+    current = {get_line_fingerprint(line): line for line in current_lines}
+    state['transitions'] += 1
+    transition = state['transitions']
+    entries = state['lines']
+    # entry: [flips, first transition seen, last flip, sample text]
+    for fingerprint in previous.keys() ^ current.keys():
+        entry = entries.get(fingerprint)
+        if entry is None:
+            entry = entries[fingerprint] = [0, transition, transition, current.get(fingerprint, previous.get(fingerprint))]
+        entry[0] += 1
+        entry[2] = transition
+    for fingerprint in [fingerprint for fingerprint, entry in entries.items() if transition - entry[2] > VOLATILE_WINDOW]:
+        del entries[fingerprint]
+
+
+def is_volatile_entry(entry, transitions):
+    flips, first_seen = entry[0], entry[1]
+    return flips >= VOLATILE_MIN_FLIPS and flips / (transitions - first_seen + 1) >= VOLATILE_FLIP_RATIO
+
+
+def get_volatile_fingerprints(state):
+    return {
+        fingerprint for fingerprint, entry in state['lines'].items()
+        if is_volatile_entry(entry, state['transitions'])
+    }
+
+
+def get_volatility_path(name):
+    return os.path.join(VOLATILITY_DIR, f"{name}.json")
+
+
+def load_job_volatility(name):
+    path = get_volatility_path(name)
+    if not os.path.exists(path):
+        return None
+    return load_json_file(path)
+
+
+def update_job_volatility(name, latest_file, latest_lines, rules):
+    # latest_lines are already normalized; older snapshots are normalized here.
+    state = load_job_volatility(name)
+    previous_lines = None
+    if state is None:
+        # Learn from recent history once; later runs only add the newest snapshot.
+        state = {'transitions': 0, 'last_file': None, 'lines': {}}
+        history = [path for _, path in get_snapshot_versions(name) if path != latest_file]
+        for path in history[-VOLATILE_BOOTSTRAP_SNAPSHOTS:]:
+            lines, _ = normalize_lines(get_snapshot_lines(path), rules)
+            if previous_lines is not None:
+                update_line_volatility(state, previous_lines, lines)
+            previous_lines = lines
+    elif state['last_file'] == latest_file:
+        return state
+    elif state['last_file'] and snapshot_exists(state['last_file']):
+        previous_lines, _ = normalize_lines(get_snapshot_lines(state['last_file']), rules)
+    if previous_lines is not None:
+        update_line_volatility(state, previous_lines, latest_lines)
+    state['last_file'] = latest_file
+    atomic_write_text(get_volatility_path(name), json.dumps(state))
+    return state
+
+
+def suppress_volatile_lines(diff_text, volatile, rules=None):
+    if not diff_text or not volatile:
+        return diff_text, 0
+    lines = diff_text.split('\r\n')
+    contents = [line.split(': ', 1)[1] if line.startswith(('ADDED: ', 'REMOVED: ')) else line for line in lines]
+    # Volatility is learned on masked lines, while the diff carries the real ones.
+    if rules:
+        contents, _ = normalize_lines(contents, rules)
+    kept = [line for line, content in zip(lines, contents) if get_line_fingerprint(content) not in volatile]
+    return '\r\n'.join(kept), len(lines) - len(kept)
+
+
+def inspect_volatile_lines(name=None):
+    names = [name] if name else [job['name'] for job in parse_cron_file()]
+    for job_name in names:
+        state = load_job_volatility(job_name)
+        if state is None:
+            print(f"{job_name}: no volatility history yet")
+            continue
+        volatile = [
+            entry for entry in state['lines'].values()
+            if is_volatile_entry(entry, state['transitions'])
+        ]
+        print(f"{job_name}: {len(volatile)} suppressed line(s) over {state['transitions']} snapshot transition(s)")
+        for flips, first_seen, _, text in sorted(volatile, key=lambda entry: -entry[0]):
+            print(f"  {flips:>4} flips / {state['transitions'] - first_seen + 1:<4} {text[:100]}")
+
+
+#returns changed / new lines, and all text subsequently.
+def compare_files(html1, html2, new_lines=None, rules=None):
+    old_lines = get_snapshot_lines(html1)
+    if new_lines is None:
+        new_lines = get_snapshot_lines(html2)
+    # Masked lines decide what is unchanged; the diff reports the real lines.
+    old_keys = new_keys = None
+    if rules:
+        old_keys, _ = normalize_lines(old_lines, rules)
+        new_keys, _ = normalize_lines(new_lines, rules)
+    if get_diff_engine() == 'difflib':
+        return diff_lines_with_difflib(old_lines, new_lines, old_keys, new_keys)
+    return diff_lines_with_hashes(old_lines, new_lines, old_keys, new_keys)
+
+def start_cpu_pool():
+    global _cpu_pool
+    if _cpu_pool is None:
+        _cpu_pool = ProcessPoolExecutor(
+            max_workers=os.cpu_count() or 1,
+            mp_context=multiprocessing.get_context('spawn')
+        )
+    return _cpu_pool
+
+
+def stop_cpu_pool():
+    global _cpu_pool
+    if _cpu_pool is not None:
+        _cpu_pool.shutdown(wait=True, cancel_futures=True)
+        _cpu_pool = None
+    _prepared_diffs.clear()
+
+
+def predict_diff_baseline(name, latest_file):
+    last_emailed_version = load_metadata().get(name, {}).get("last_emailed_version")
+    if last_emailed_version and snapshot_exists(last_emailed_version):
+        return last_emailed_version
+    return get_oldest_snapshot(name, exclude=latest_file)
+
+
+def prepare_diff(name, latest_file):
+    if _cpu_pool is None:
+        return
+    baseline = predict_diff_baseline(name, latest_file)
+    if baseline is None:
+        return
+    # Workers import gptcron fresh and chdir to the script directory, so hand
+    # them absolute paths and the job's rules rather than letting them read config.
+    _prepared_diffs[(baseline, latest_file)] = _cpu_pool.submit(
+        compare_files, os.path.abspath(baseline), os.path.abspath(latest_file),
+        None, get_normalizer_rules(name)
+    )
+
+
+def diff_snapshots(baseline, latest_file, new_lines=None, rules=None):
+    future = _prepared_diffs.pop((baseline, latest_file), None)
+    if future is None and _cpu_pool is not None:
+        future = _cpu_pool.submit(
+            compare_files, os.path.abspath(baseline), os.path.abspath(latest_file), None, rules
+        )
+    if future is None:
+        return compare_files(baseline, latest_file, new_lines, rules)
+    return future.result()
+
+
+def get_http_session():
+    global _http_session
+    with _http_session_lock:
+        if _http_session is None:
+            session = requests.Session()
+            session.headers['User-Agent'] = USER_AGENT
+            # Fetches stay stateless as with bare requests.get: no cookies carried
+            # from one job (or one run) to the next.
+            session.cookies.set_policy(http.cookiejar.DefaultCookiePolicy(allowed_domains=[]))
+            adapter = HTTPAdapter(pool_connections=HTTP_POOL_HOSTS, pool_maxsize=FETCH_WORKERS_PER_HOST)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            _http_session = session
+        return _http_session
+
+
+def http_get(url, headers=None):
+    return get_http_session().get(url, headers=headers, timeout=HTTP_TIMEOUT)
+
+
+def get_http_connection_stats():
+    # {host: (requests sent, connections opened)} from the live urllib3 pools.
+    stats = {}
+    if _http_session is None:
+        return stats
+    pools = _http_session.get_adapter('https://').poolmanager.pools
+    for key in pools.keys():
+        pool = pools.get(key)
+        if pool is None:
+            continue
+        requests_sent, connections = stats.get(pool.host, (0, 0))
+        stats[pool.host] = (requests_sent + pool.num_requests, connections + pool.num_connections)
+    return stats
+
+
+def log_http_connection_stats():
+    stats = get_http_connection_stats()
+    if not stats:
+        return
+    requests_sent = sum(value[0] for value in stats.values())
+    connections = sum(value[1] for value in stats.values())
+    log_message(
+        f"HTTP connection reuse: {requests_sent} request(s) over {connections} connection(s) "
+        f"to {len(stats)} host(s), {requests_sent - connections} reused"
+    )
+
+
+def record_job_timing(name, stage, seconds, **counts):
+    with _job_timings_lock:
+        timing = _job_timings.setdefault(name, {})
+        timing[stage] = timing.get(stage, 0) + seconds
+        timing.update(counts)
+
+
+def discard_job_timing(name):
+    with _job_timings_lock:
+        _job_timings.pop(name, None)
+
+
+def get_job_timing_seconds(timing):
+    return sum(timing.get(stage, 0) for stage in TRACE_STAGES)
+
+
+def format_job_timing(timing):
+    counts = {'download': 'bytes', 'extract': 'lines', 'diff': 'diff_lines'}
+    parts = []
+    for stage in TRACE_STAGES:
+        if stage in timing:
+            count_key = counts.get(stage)
+            count = f" ({timing[count_key]} {count_key.replace('_', ' ')})" if count_key in timing else ""
+            parts.append(f"{stage} {timing[stage]:.2f}s{count}")
+    return ', '.join(parts) or 'no timed stages'
+
+
+def build_run_report(started, finished, job_count, total_jobs, changes, emails_sent, emails_failed):
+    with _job_timings_lock:
+        timings = {name: dict(timing) for name, timing in _job_timings.items()}
+    slowest = sorted(timings.items(), key=lambda item: -get_job_timing_seconds(item[1]))
+    return {
+        'started': round(started, 3),
+        'seconds': round(finished - started, 3),
+        'jobs': job_count,
+        'total_jobs': total_jobs,
+        'changes': changes,
+        'emails_sent': emails_sent,
+        'emails_failed': emails_failed,
+        'stages': {
+            stage: round(sum(timing.get(stage, 0) for timing in timings.values()), 3)
+            for stage in TRACE_STAGES
+        },
+        'bytes': sum(timing.get('bytes', 0) for timing in timings.values()),
+        'lines': sum(timing.get('lines', 0) for timing in timings.values()),
+        'slowest': [
+            dict({key: round(value, 3) if isinstance(value, float) else value for key, value in timing.items()}, job=name)
+            for name, timing in slowest[:RUN_REPORT_SLOWEST_JOBS]
+        ]
+    }
+
+
+def write_run_report(report):
+    try:
+        with open(RUN_REPORTS_FILE, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(report, separators=(',', ':')) + '\n')
+    except OSError as e:
+        log_message(f"Could not write run report: {str(e)}")
+
+
+def show_run_report(count=1):
+    reports = []
+    if os.path.exists(RUN_REPORTS_FILE):
+        with open(RUN_REPORTS_FILE, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    reports.append(json.loads(line))
+                except ValueError:
+                    continue  # a line cut short by a crash
+    if not reports:
+        print("No runs recorded yet.")
+        return
+    for report in reports[-count:]:
+        started = datetime.fromtimestamp(report['started']).strftime('%Y-%m-%d %H:%M:%S')
+        print(
+            f"Run at {started}: {report['seconds']:.1f}s, {report['jobs']} of {report['total_jobs']} job(s) checked, "
+            f"{report['changes']} change(s), {report['emails_sent']} email(s) sent, {report['emails_failed']} failed"
+        )
+        print(f"  Fetched {report['bytes']} bytes, {report['lines']} visible lines")
+        print("  Stage totals: " + ', '.join(f"{stage} {seconds:.2f}s" for stage, seconds in report['stages'].items()))
+        if report['slowest']:
+            print("  Slowest jobs:")
+            for timing in report['slowest']:
+                print(f"    {timing['job'][:32]:<32} {get_job_timing_seconds(timing):>8.2f}s  {format_job_timing(timing)}")
+        print()
+
+
+def hash_visible_lines(lines):
+    return hashlib.sha256('\n'.join(lines).encode('utf-8')).hexdigest()
+
+
+def extract_and_hash_visible_lines(html_content, backend=None):
+    lines = extract_visible_lines_from_html(html_content, backend)
+    return lines, hash_visible_lines(lines)
+
+
+def download_url(url, name, validators=None, previous_hash=None):
     output_file = f"data/{name}/{name}-{datetime.now().strftime('%Y%m%d-%H-%M-%S-%f')}.html"
     os.makedirs(os.path.dirname(output_file), exist_ok=True)
-    user_agent = 'Mozilla/5.0 (X11; Linux x86_64; rv:152.0) Gecko/20100101 Firefox/152.0'
 
     try:
-        # Use requests library instead of wget for better cross-platform compatibility
-        headers = {'User-Agent': user_agent}
-        response = requests.get(url, headers=headers, timeout=30)
+        headers = {}
+        if validators:
+            if validators.get('etag'):
+                headers['If-None-Match'] = validators['etag']
+            if validators.get('last_modified'):
+                headers['If-Modified-Since'] = validators['last_modified']
+        started = time.monotonic()
+        response = http_get(url, headers=headers)
+        record_job_timing(name, 'download', time.monotonic() - started)
         response.raise_for_status()
+        if response.status_code == 304:
+            log_message(f"Not modified since last check: {url}")
+            return None, validators, previous_hash
+
+        started = time.monotonic()
+        if _cpu_pool is not None:
+            # Parsing holds the GIL, so with --cpu-pool it runs in a worker and
+            # the fetch thread only waits. Workers don't read config.json.
+            lines, content_hash = _cpu_pool.submit(
+                extract_and_hash_visible_lines, response.text, get_html_parser_backend()
+            ).result()
+        else:
+            lines, content_hash = extract_and_hash_visible_lines(response.text)
+        record_job_timing(name, 'extract', time.monotonic() - started, bytes=len(response.text), lines=len(lines))
+        if previous_hash and content_hash == previous_hash:
+            log_message(f"Visible content unchanged since last check: {url}")
+            return None, get_response_validators(response), content_hash
 
-        with open(output_file, 'w', encoding='utf-8') as f:
-            f.write(response.text)
+        save_snapshot(output_file, response.text, lines)
 
         log_message(f"Downloaded {url} to {output_file}")
-        return output_file
+        return output_file, get_response_validators(response), content_hash
     except requests.exceptions.RequestException as e:
         log_message(f"Error downloading {url}: {e}")
         raise
 
+
+def get_response_validators(response):
+    validators = {}
+    if response.headers.get('ETag'):
+        validators['etag'] = response.headers['ETag']
+    if response.headers.get('Last-Modified'):
+        validators['last_modified'] = response.headers['Last-Modified']
+    return validators
+
+
+def get_request_validators(name, metadata):
+    # Only revalidate when there is a snapshot to fall back on; otherwise a 304
+    # or an unchanged hash would leave the job with nothing to diff against.
+    if get_last_file(name)[0] is None:
+        return None, None
+    job_state = metadata.get(name, {})
+    return job_state.get('validators') or None, job_state.get('content_hash')
+
+
+def record_job_check(name, validators, content_hash):
+    def update(job_state):
+        job_state['last_checked'] = time.time()
+        if validators:
+            job_state['validators'] = validators
+        else:
+            job_state.pop('validators', None)
+        if content_hash:
+            job_state['content_hash'] = content_hash
+    update_job_metadata(name, update)
+
+
+def mark_job_checked(name):
+    # Records only the check time: the validators and content hash stay those
+    # of the last snapshot that was fully processed.
+    update_job_metadata(name, lambda job_state: job_state.update(last_checked=time.time()))
+
+
+def forget_job_check(name):
+    # Next run downloads and diffs the page in full, even if it is unchanged.
+    def update(job_state):
+        job_state.pop('validators', None)
+        job_state.pop('content_hash', None)
+    update_job_metadata(name, update)
+
+
 def is_valid_url(url):
     regex = re.compile(
         r'^(?:http|ftp)s?://'
@@ -1165,11 +3122,16 @@ def gpt_generate_job_names(url, text, exclusions):
     Please return JUST the name you suggest, simplest form possible, max 4 words or so, as a json string like this: {{result: "<your result>"}}.
     """
 
+    def is_usable_name_response(response_text):
+        response, got = attempt_to_deserialize_openai_json(response_text)
+        return got and isinstance(response, dict) and isinstance(response.get('result'), str) and is_valid_job_name(response['result'])
+
     res = call_llm(
         prompt=prompt,
         system_prompt="You are a helpful assistant which always returns JSON.",
         response_format={"type": "json_object"},
-        max_tokens=200
+        max_tokens=200,
+        cache_check=is_usable_name_response
     )
     response, got = attempt_to_deserialize_openai_json(res)
     if not got:
@@ -1190,30 +3152,282 @@ def get_gpt_name(url, exclusions = None):
         return any(job['name'] == name for job in jobs)
 
     try:
-        latest_file = download_url(url, name="_no-name-yet")
-        with open(latest_file, 'r', encoding='utf-8') as file:
-            html_content = file.read()
-            soup = BeautifulSoup(html_content, 'html.parser')
-            text_content = soup.get_text(separator=' ', strip=True)
-            suggested_name = gpt_generate_job_names(url, text_content, exclusions)
-
-            if not is_valid_name(suggested_name):
-                raise ValueError(f"Generated name '{suggested_name}' is invalid.")
-
-            if is_name_duplicate(suggested_name):
-                #if we already have been excluded from a name, and yet we generated it again or another existing one too, just fail.
-                if exclusions:
-                    raise ValueError(f"Generated name '{suggested_name}' already exists.")
-                else:
-                    #try one time to generate another one, overcoming the last duplicate
-                    return get_gpt_name(url, suggested_name)
-            return suggested_name
+        latest_file, _, _ = download_url(url, name="_no-name-yet")
+        # The lookup download is not a job, so keep it out of run reports.
+        discard_job_timing("_no-name-yet")
+        text_content = load_snapshot_document(latest_file)['text']
+        suggested_name = gpt_generate_job_names(url, text_content, exclusions)
+
+        if not is_valid_name(suggested_name):
+            raise ValueError(f"Generated name '{suggested_name}' is invalid.")
+
+        if is_name_duplicate(suggested_name):
+            #if we already have been excluded from a name, and yet we generated it again or another existing one too, just fail.
+            if exclusions:
+                raise ValueError(f"Generated name '{suggested_name}' already exists.")
+            else:
+                #try one time to generate another one, overcoming the last duplicate
+                return get_gpt_name(url, suggested_name)
+        return suggested_name
     except Exception as e:
 
         raise ValueError(f"Failed to generate a valid job name for {url}: {str(e)} {traceback.format_exc()}")
 
 
-def run_job(name):
+def get_url_host(url):
+    return (urlsplit(url).hostname or '').lower()
+
+
+def interleave_jobs_by_host(jobs):
+    # Round-robin across hosts so early workers don't all queue on one host's slots.
+    jobs_by_host = defaultdict(list)
+    for job in jobs:
+        jobs_by_host[get_url_host(job['url'])].append(job)
+    queues = list(jobs_by_host.values())
+    interleaved = []
+    while queues:
+        interleaved.extend(queue.pop(0) for queue in queues)
+        queues = [queue for queue in queues if queue]
+    return interleaved
+
+
+def start_job_downloads(jobs, executor, metadata):
+    host_slots = {
+        get_url_host(job['url']): threading.BoundedSemaphore(FETCH_WORKERS_PER_HOST)
+        for job in jobs
+    }
+
+    def fetch(job):
+        with host_slots[get_url_host(job['url'])]:
+            download = download_url(
+                job['url'], job['name'], *get_request_validators(job['name'], metadata)
+            )
+        if download[0] is not None:
+            prepare_diff(job['name'], download[0])
+        return download
+
+    return {
+        job['name']: executor.submit(fetch, job)
+        for job in interleave_jobs_by_host(jobs)
+    }
+
+
+def should_batch_summary(job):
+    return bool(load_optional_config().get('llm_batch', False)) and job['frequency'] in BATCH_FREQUENCIES
+
+
+def get_batch_queue_dir():
+    return os.path.join(LLM_BATCH_DIR, 'queued')
+
+
+def list_json_files(directory):
+    if not os.path.isdir(directory):
+        return []
+    return sorted(
+        os.path.join(directory, filename)
+        for filename in os.listdir(directory)
+        if filename.endswith('.json')
+    )
+
+
+def load_json_file(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def has_pending_batch_summary(name):
+    for path in list_json_files(get_batch_queue_dir()):
+        if load_json_file(path)['name'] == name:
+            return True
+    for path in list_json_files(LLM_BATCH_DIR):
+        if any(request['name'] == name for request in load_json_file(path)['requests']):
+            return True
+    return False
+
+
+def queue_batch_summary(job, prompt, diff_text, baseline, recorded_baseline, latest_file):
+    model = get_model_config()['default_model']
+    # Anthropic custom ids allow only [A-Za-z0-9_-]; legacy job names may not.
+    custom_id = 'diff-' + hashlib.sha256(f"{job['name']}\0{latest_file}".encode('utf-8')).hexdigest()[:32]
+    request = {
+        'custom_id': custom_id,
+        'name': job['name'],
+        'url': job['url'],
+        'provider': get_model_provider(model),
+        'model': model,
+        'prompt': prompt,
+        'diff_text': diff_text,
+        'baseline': baseline,
+        'recorded_baseline': recorded_baseline,
+        'latest_file': latest_file,
+        'queued': time.time()
+    }
+    atomic_write_text(os.path.join(get_batch_queue_dir(), f"{custom_id}.json"), json.dumps(request))
+    return custom_id
+
+
+def submit_batch_requests(provider, model, requests_list, config):
+    client = get_provider_client(provider, config)
+    if provider == 'anthropic':
+        batch = client.messages.batches.create(requests=[
+            {
+                'custom_id': request['custom_id'],
+                'params': build_anthropic_request(
+                    model, request['prompt'], DIFF_SUMMARY_SYSTEM_PROMPT,
+                    DIFF_SUMMARY_MAX_TOKENS, {"type": "json_object"}, cache_system_prompt=True
+                )
+            }
+            for request in requests_list
+        ])
+        return batch.id
+    lines = [
+        json.dumps({
+            'custom_id': request['custom_id'],
+            'method': 'POST',
+            'url': '/v1/chat/completions',
+            'body': build_openai_request(
+                model, request['prompt'], DIFF_SUMMARY_SYSTEM_PROMPT,
+                DIFF_SUMMARY_MAX_TOKENS, {"type": "json_object"}
+            )
+        })
+        for request in requests_list
+    ]
+    input_file = client.files.create(file=('batch.jsonl', '\n'.join(lines).encode('utf-8')), purpose='batch')
+    batch = client.batches.create(
+        input_file_id=input_file.id, endpoint='/v1/chat/completions', completion_window='24h'
+    )
+    return batch.id
+
+
+def fetch_batch_results(provider, batch_id, config):
+    # None while the batch is still running, else {custom_id: response text}
+    # for the requests that succeeded.
+    client = get_provider_client(provider, config)
+    results = {}
+    if provider == 'anthropic':
+        if client.messages.batches.retrieve(batch_id).processing_status != 'ended':
+            return None
+        for entry in client.messages.batches.results(batch_id):
+            if entry.result.type == 'succeeded' and entry.result.message.content:
+                results[entry.custom_id] = entry.result.message.content[0].text
+        return results
+    batch = client.batches.retrieve(batch_id)
+    if batch.status in ('validating', 'in_progress', 'finalizing', 'cancelling'):
+        return None
+    if batch.output_file_id:
+        for line in client.files.content(batch.output_file_id).text.splitlines():
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            response = record.get('response') or {}
+            if response.get('status_code') != 200:
+                continue
+            content = response['body']['choices'][0]['message']['content']
+            if content:
+                results[record['custom_id']] = content.strip()
+    return results
+
+
+def submit_llm_batches():
+    queued = [(path, load_json_file(path)) for path in list_json_files(get_batch_queue_dir())]
+    if not queued:
+        return
+    config = get_model_config()
+    groups = defaultdict(list)
+    for path, request in queued:
+        groups[(request['provider'], request['model'])].append((path, request))
+    for (provider, model), entries in groups.items():
+        requests_list = [request for _, request in entries]
+        batch_id = submit_batch_requests(provider, model, requests_list, config)
+        atomic_write_text(
+            os.path.join(LLM_BATCH_DIR, f"{batch_id}.json"),
+            json.dumps({'provider': provider, 'batch_id': batch_id, 'submitted': time.time(), 'requests': requests_list})
+        )
+        for path, _ in entries:
+            os.remove(path)
+        log_message(f"Submitted {len(requests_list)} change summary request(s) to the {provider} batch API as {batch_id}")
+
+
+def collect_llm_batches():
+    # Returns (emails sent, emails failed) for the run summary.
+    sent = 0
+    failed = 0
+    batch_paths = list_json_files(LLM_BATCH_DIR)
+    if not batch_paths:
+        return sent, failed
+    config = get_model_config()
+    for path in batch_paths:
+        batch = load_json_file(path)
+        results = fetch_batch_results(batch['provider'], batch['batch_id'], config)
+        if results is None:
+            continue
+        log_message(f"Batch {batch['batch_id']} finished with {len(results)} of {len(batch['requests'])} summaries")
+        for request in batch['requests']:
+            name = request['name']
+            response_text = results.get(request['custom_id'])
+            if response_text is None:
+                log_message(f"Batch {batch['batch_id']} returned no summary for job {name}; it will be diffed and summarized again on its next run.")
+                forget_job_check(name)
+                continue
+            try:
+                if finish_batch_summary(request, response_text):
+                    sent += 1
+            except EmailDeliveryError as e:
+                # The rendered email waits in the outbox, so the summary is not paid for again.
+                failed += 1
+                log_message(f"Email delivery failed for batched job {name}: {str(e)}")
+            except Exception as e:
+                log_message(f"Unexpected error finishing batched summary for job {name}: {str(e)}; it will be diffed and summarized again on its next run.")
+                log_message(traceback.format_exc(), error=True)
+                forget_job_check(name)
+        os.remove(path)
+    return sent, failed
+
+
+def finish_batch_summary(request, response_text):
+    name = request['name']
+    url = request['url']
+    latest_file = request['latest_file']
+    metadata = load_metadata()
+    if metadata.get(name, {}).get('last_emailed_version') != request['recorded_baseline']:
+        log_message(f"Discarding batched summary for job {name}: its email baseline moved while the batch ran.")
+        return False
+    if not snapshot_exists(latest_file):
+        log_message(f"Discarding batched summary for job {name}: snapshot {os.path.basename(latest_file)} is gone.")
+        forget_job_check(name)
+        return False
+
+    summary, score, brief_summary = parse_diff_summary(response_text, request['prompt'], url, name)
+    if score < MIN_SCORE:
+        log_message(f"Score {score} below threshold for job {name}. Email not sent.")
+        return False
+
+    subject, body = create_email_content(
+        name, url, brief_summary, summary, request['diff_text'], score,
+        latest_file, [request['baseline'], latest_file]
+    )
+    deliver_job_email(name, subject, body, load_config()['to_email'], latest_file)
+    log_message(f"Changes were detected and emailed for batched job: {name}")
+    return True
+
+
+def run_llm_batch_step(step):
+    try:
+        return step()
+    except Exception as e:
+        log_message(f"LLM batch {step.__name__} failed: {str(e)} - will retry next run")
+        log_message(traceback.format_exc(), error=True)
+
+
+def get_job_deferral(job, allow_batch):
+    if has_pending_outbox_email(job['name']):
+        return "An email is still waiting in the outbox"
+    if allow_batch and should_batch_summary(job) and has_pending_batch_summary(job['name']):
+        return "A batched summary is still pending"
+    return None
+
+
+def run_job(name, pending_download=None, allow_batch=False):
     jobs = parse_cron_file()
     job = next((job for job in jobs if job["name"] == name), None)
     if not job:
@@ -1221,80 +3435,127 @@ def run_job(name):
         return False
 
     url = job["url"]
-    latest_file = download_url(url, name)
+    if pending_download is not None:
+        latest_file, validators, content_hash = pending_download.result()
+    else:
+        # `run` and `test` force a comparison, so only scheduled runs (which
+        # pass pending_download) revalidate or skip on an unchanged hash.
+        latest_file, validators, content_hash = download_url(url, name)
+    if latest_file is None:
+        log_message(f"No changes detected for job: {name} (unchanged since last check)")
+        record_job_check(name, validators, content_hash)
+        return False
+    deferral = get_job_deferral(job, allow_batch)
+    if deferral:
+        # Drop this snapshot and keep the last processed one's validators, so
+        # the first check after the deferral ends diffs whatever has changed.
+        log_message(f"{deferral} for job {name}; the page will be diffed again on its next check after that.")
+        delete_snapshot(latest_file)
+        mark_job_checked(name)
+        return False
     try:
-        return process_downloaded_job(job, latest_file)
+        changes_detected = process_downloaded_job(job, latest_file, allow_batch=allow_batch)
+    except EmailDeliveryError:
+        # The rendered email waits in the outbox, so the snapshot counts as processed.
+        record_job_check(name, validators, content_hash)
+        raise
     except BaseException:
-        if os.path.exists(latest_file):
-            os.remove(latest_file)
+        delete_snapshot(latest_file)
         raise
+    # Validators and the content hash are only kept once the snapshot was
+    # processed, so a failed run is retried with a full download and diff.
+    if isinstance(changes_detected, Future):
+        def finish_check(future):
+            if future.exception() is None or isinstance(future.exception(), EmailDeliveryError):
+                record_job_check(name, validators, content_hash)
+            else:
+                delete_snapshot(latest_file)
+        changes_detected.add_done_callback(finish_check)
+        return changes_detected
+    record_job_check(name, validators, content_hash)
+    return changes_detected
 
 
-def process_downloaded_job(job, latest_file):
+def process_downloaded_job(job, latest_file, allow_batch=False):
     name = job["name"]
     url = job["url"]
     metadata = load_metadata()
-    snapshots = get_snapshot_versions(name)
-    previous_versions = [path for _, path in snapshots if path != latest_file]
+    oldest_previous_version = get_oldest_snapshot(name, exclude=latest_file)
     last_emailed_version = metadata.get(name, {}).get("last_emailed_version")
+    document = load_snapshot_document(latest_file)
 
-    if last_emailed_version is None and not previous_versions:
-        with open(latest_file, 'r', encoding='utf-8') as f:
-            html_content = f.read()
-        context_text = extract_text_from_html(html_content)
+    if last_emailed_version is None and oldest_previous_version is None:
+        context_text = document['text']
         log_message(f"First-time check for job {name} at {url}")
         if context_text == '':
             log_message(f"First-time check for job {name} at {url} got no data from the page.")
             return False
+        started = time.monotonic()
         summary, brief_summary = summarize_page(context_text, url, name, job)
+        record_job_timing(name, 'summarize', time.monotonic() - started)
         subject, body = create_summary_email_content(job["name"], url, brief_summary, summary)
-        send_email(job["name"], subject, body, load_config()['to_email'])
-        metadata[name] = {"last_emailed_version": latest_file}
-        save_metadata(metadata)
-        return True
+        return deliver_job_email(job["name"], subject, body, load_config()['to_email'], latest_file)
     if last_emailed_version is None:
-        last_emailed_version = previous_versions[0]
+        last_emailed_version = oldest_previous_version
         log_message(
             f"No email baseline was recorded for job {name}; "
             f"using oldest available snapshot {os.path.basename(last_emailed_version)}."
         )
 
-    if not os.path.exists(last_emailed_version):
-        if not previous_versions:
+    if not snapshot_exists(last_emailed_version):
+        if oldest_previous_version is None:
             log_message(
                 f"Last emailed version is missing for job {name}; sending a recovery summary."
             )
-            metadata.pop(name, None)
-            with open(latest_file, 'r', encoding='utf-8') as f:
-                html_content = f.read()
-            context_text = extract_text_from_html(html_content)
+            context_text = document['text']
             if not context_text:
                 return False
+            started = time.monotonic()
             summary, brief_summary = summarize_page(context_text, url, name, job)
+            record_job_timing(name, 'summarize', time.monotonic() - started)
             subject, body = create_summary_email_content(job["name"], url, brief_summary, summary)
-            send_email(job["name"], subject, body, load_config()['to_email'])
-            metadata[name] = {"last_emailed_version": latest_file}
-            save_metadata(metadata)
-            return True
-        last_emailed_version = previous_versions[0]
+            return deliver_job_email(job["name"], subject, body, load_config()['to_email'], latest_file)
+        last_emailed_version = oldest_previous_version
         log_message(
             f"Last emailed version is missing for job {name}; "
             f"using oldest available snapshot {os.path.basename(last_emailed_version)}."
         )
 
-    diff_text, all_text = compare_files(last_emailed_version, latest_file)
+    rules = get_normalizer_rules(name)
+    started = time.monotonic()
+    diff_text, all_text = diff_snapshots(last_emailed_version, latest_file, document['lines'], rules)
+    record_job_timing(name, 'diff', time.monotonic() - started, diff_lines=diff_text.count('\r\n') + 1 if diff_text else 0)
+    normalized_lines, fired = normalize_lines(document['lines'], rules)
+    if fired:
+        record_normalizer_fires(name, last_emailed_version, document['lines'], fired, bool(diff_text))
+    volatility = update_job_volatility(name, latest_file, normalized_lines, rules)
+    diff_text, suppressed = suppress_volatile_lines(diff_text, get_volatile_fingerprints(volatility), rules)
+    if suppressed:
+        log_message(f"Suppressed {suppressed} volatile line(s) in the diff for job {name}")
     if not diff_text:
         log_message(f"No changes detected for job: {name}")
         return False
 
     print(f"DIFF TEXT: {len(diff_text)} characters")
-    with open(latest_file, 'r', encoding='utf-8') as f:
-        html_content = f.read()
-    log_message(f"Detected changes for job {name} at {url}")
+    log_message(
+        f"Detected changes for job {name} at {url} "
+        f"({document['size']} bytes, {len(document['lines'])} visible lines)"
+    )
+
+    # Oversized diffs are summarized in parts right away rather than batched.
+    if allow_batch and should_batch_summary(job) and len(get_diff_summary_chunks(diff_text, document, url)) == 1:
+        queue_batch_summary(
+            job, build_diff_summary_prompt(diff_text, document, url), diff_text,
+            last_emailed_version, metadata.get(name, {}).get("last_emailed_version"), latest_file
+        )
+        log_message(f"Queued change summary for job {name} for the batch API.")
+        return False
 
+    started = time.monotonic()
     summary, score, brief_summary = summarize_diff(
-        diff_text, all_text, html_content, url, name
+        diff_text, all_text, document, url, name
     )
+    record_job_timing(name, 'summarize', time.monotonic() - started)
     if score < MIN_SCORE:
         log_message(f"Score {score} below threshold for job {name}. Email not sent.")
         return False
@@ -1303,10 +3564,7 @@ def process_downloaded_job(job, latest_file):
         job["name"], url, brief_summary, summary, diff_text, score,
         latest_file, [last_emailed_version, latest_file]
     )
-    send_email(job["name"], subject, body, load_config()['to_email'])
-    metadata[name] = {"last_emailed_version": latest_file}
-    save_metadata(metadata)
-    return True
+    return deliver_job_email(job["name"], subject, body, load_config()['to_email'], latest_file)
 
 def add_job(name, url, frequency):
     jobs = parse_cron_file()
@@ -1505,7 +3763,7 @@ def is_permanent_http_error(status_code):
     return 400 <= status_code < 600
 
 
-def check_cron(force=False):
+def check_cron(force=False, cpu_pool=False):
     lock_file = open(CRON_LOCK_FILE, 'w')
     lock_acquired = False
     try:
@@ -1515,8 +3773,9 @@ def check_cron(force=False):
         except BlockingIOError:
             log_message("Another check_cron process is already running; skipping this run.")
             return
-        run_cron_checks(force=bool(force))
+        run_cron_checks(force=bool(force), cpu_pool=cpu_pool)
     finally:
+        close_smtp_session()
         try:
             if lock_acquired:
                 fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
@@ -1524,58 +3783,133 @@ def check_cron(force=False):
             lock_file.close()
 
 
-def run_cron_checks(force=False):
+def get_next_run_time(job, metadata):
+    # Every finished check records last_checked, so scheduling reads only the
+    # metadata; the snapshot catalog is loaded for jobs that have none yet.
+    last_run_time = metadata.get(job['name'], {}).get('last_checked')
+    if last_run_time is None:
+        _, last_run_time = get_last_file(job['name'])
+    return (last_run_time or 0) + parse_frequency(job['frequency'])
+
+
+def is_job_due(job, now, metadata):
+    return now >= get_next_run_time(job, metadata)
+
+
+def run_cron_checks(force=False, cpu_pool=False):
     now = time.time()
     jobs = parse_cron_file()
-    total_jobs = len(jobs)
+    metadata = load_metadata()
+    due_jobs = []
+    for job in jobs:
+        try:
+            if force or is_job_due(job, now, metadata):
+                due_jobs.append(job)
+        except Exception as e:
+            log_message(f"Unexpected error for job {job['name']}: {str(e)}")
+            log_message(traceback.format_exc(), error=True)
+    run_due_jobs(due_jobs, len(jobs), metadata, cpu_pool=cpu_pool)
+
+
+def run_due_jobs(due_jobs, total_jobs, metadata, cpu_pool=False):
     jobs_with_changes = 0
     emails_sent = 0
     emails_failed = 0
     accumulated_errors = []
-
-    for job in jobs:
-        frequency = job['frequency']
-        name = job['name']
-        url = job['url']
+    queued_emails = []
+    run_started = time.time()
+    with _job_timings_lock:
+        _job_timings.clear()
+
+    # Downloads run concurrently; processing, email and error accounting stay
+    # sequential and in .gptcron order.
+    if cpu_pool:
+        start_cpu_pool()
+    # Earlier batches are finished first so their baselines are current.
+    batch_sent, batch_failed = run_llm_batch_step(collect_llm_batches) or (0, 0)
+    jobs_with_changes += batch_sent
+    emails_sent += batch_sent
+    emails_failed += batch_failed
+    # Outbox retries go first, so jobs whose email gets through are diffed again this run.
+    outbox_sent, outbox_failed = retry_outbox_emails()
+    emails_sent += outbox_sent
+    emails_failed += outbox_failed
+    start_mail_queue()
+    fetch_pool = ThreadPoolExecutor(max_workers=FETCH_WORKERS, thread_name_prefix='fetch')
+    try:
+        pending_downloads = start_job_downloads(due_jobs, fetch_pool, metadata)
+        for job in due_jobs:
+            name = job['name']
+            url = job['url']
+            try:
+                log_message(f"Running job: {name}")
+                try:
+                    changes_detected = run_job(name, pending_download=pending_downloads[name], allow_batch=True)
+                finally:
+                    with _job_timings_lock:
+                        timing = dict(_job_timings.get(name, {}))
+                    log_message(f"Timing for job {name}: {format_job_timing(timing)}")
+                if isinstance(changes_detected, Future):
+                    queued_emails.append((name, changes_detected))
+                elif changes_detected:
+                    jobs_with_changes += 1
+                    emails_sent += 1
+                    log_message(f"Changes were detected and emailed for job: {name}")
+                else:
+                    log_message(f"No significant changes detected for job: {name}")
+            except EmailDeliveryError as e:
+                emails_failed += 1
+                log_message(f"Email delivery failed for job {name}: {str(e)}")
+            except requests.exceptions.HTTPError as e:
+                status_code = e.response.status_code if e.response is not None else 0
+                if is_permanent_http_error(status_code):
+                    error_type = "Page Not Found" if status_code == 404 else f"HTTP {status_code}"
+                    accumulated_errors.append({
+                        'job_name': name,
+                        'url': url,
+                        'status_code': status_code,
+                        'error_type': error_type
+                    })
+                    log_message(f"Permanent HTTP error for job {name}: {status_code} - {url}")
+                else:
+                    log_message(f"Temporary HTTP error for job {name}: {status_code} - will retry next run")
+            except requests.exceptions.RequestException as e:
+                log_message(f"Network error for job {name}: {str(e)} - will retry next run")
+            except Exception as e:
+                log_message(f"Unexpected error for job {name}: {str(e)}")
+                log_message(traceback.format_exc(), error=True)
+    finally:
+        fetch_pool.shutdown(wait=True, cancel_futures=True)
+        if cpu_pool:
+            stop_cpu_pool()
+        stop_mail_queue()
+    for name, delivery in queued_emails:
         try:
-            _, last_run_time = get_last_file(name)
-            if last_run_time is None:
-                last_run_time = 0
-            next_run_time = last_run_time + parse_frequency(frequency)
-            if now < next_run_time and not force:
-                continue
-
-            log_message(f"Running job: {name}")
-            changes_detected = run_job(name)
-            if changes_detected:
-                jobs_with_changes += 1
-                emails_sent += 1
-                log_message(f"Changes were detected and emailed for job: {name}")
-            else:
-                log_message(f"No significant changes detected for job: {name}")
+            delivery.result()
+            jobs_with_changes += 1
+            emails_sent += 1
+            log_message(f"Changes were detected and emailed for job: {name}")
         except EmailDeliveryError as e:
             emails_failed += 1
             log_message(f"Email delivery failed for job {name}: {str(e)}")
-        except requests.exceptions.HTTPError as e:
-            status_code = e.response.status_code if e.response is not None else 0
-            if is_permanent_http_error(status_code):
-                error_type = "Page Not Found" if status_code == 404 else f"HTTP {status_code}"
-                accumulated_errors.append({
-                    'job_name': name,
-                    'url': url,
-                    'status_code': status_code,
-                    'error_type': error_type
-                })
-                log_message(f"Permanent HTTP error for job {name}: {status_code} - {url}")
-            else:
-                log_message(f"Temporary HTTP error for job {name}: {status_code} - will retry next run")
-        except requests.exceptions.RequestException as e:
-            log_message(f"Network error for job {name}: {str(e)} - will retry next run")
         except Exception as e:
             log_message(f"Unexpected error for job {name}: {str(e)}")
-            log_message(traceback.format_exc())
+            log_message(''.join(traceback.format_exception(e)), error=True)
+    run_llm_batch_step(submit_llm_batches)
+    log_http_connection_stats()
 
     log_message(f"Checked cron jobs. Total: {total_jobs}, Changes: {jobs_with_changes}, Emails Sent: {emails_sent}, Emails Failed: {emails_failed}")
+    if _llm_cache_stats:
+        log_message(
+            f"LLM cache: {_llm_cache_stats['hits']} hit(s), {_llm_cache_stats['misses']} miss(es), "
+            f"{_llm_cache_stats['discarded']} discarded, {_llm_cache_stats['evicted']} evicted"
+        )
+    if _llm_usage_totals:
+        log_message(
+            f"LLM usage: {_llm_usage_totals['calls']} call(s), {_llm_usage_totals['input']} input, "
+            f"{_llm_usage_totals['output']} output, {_llm_usage_totals['cache_write']} cache write, "
+            f"{_llm_usage_totals['cache_read']} cache read token(s)"
+        )
 
     if accumulated_errors:
         log_message(f"Sending batch error notification for {len(accumulated_errors)} permanent error(s)")
@@ -1584,6 +3918,103 @@ def run_cron_checks(force=False):
         except EmailDeliveryError as e:
             log_message(f"Failed to send batch error notification: {str(e)}")
 
+    write_run_report(build_run_report(
+        run_started, time.time(), len(due_jobs), total_jobs, jobs_with_changes, emails_sent, emails_failed
+    ))
+    flush_log()
+
+
+def get_cron_file_mtime():
+    try:
+        return os.stat('.gptcron').st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+def build_schedule(jobs, metadata):
+    schedule = [(get_next_run_time(job, metadata), job['name'], job) for job in jobs]
+    heapq.heapify(schedule)
+    return schedule
+
+
+def run_scheduler(stop_event):
+    cron_mtime = None
+    jobs = []
+    schedule = []
+    last_batch_poll = 0
+    while not stop_event.is_set():
+        current_mtime = get_cron_file_mtime()
+        if current_mtime != cron_mtime:
+            cron_mtime = current_mtime
+            jobs = parse_cron_file()
+            schedule = build_schedule(jobs, load_metadata())
+            log_message(f"Daemon loaded {len(jobs)} job(s) from .gptcron")
+
+        now = time.time()
+        due_jobs = []
+        while schedule and schedule[0][0] <= now:
+            due_jobs.append(heapq.heappop(schedule)[2])
+        if due_jobs:
+            run_due_jobs(due_jobs, len(jobs), load_metadata())
+            last_batch_poll = time.time()
+            metadata = load_metadata()
+            now = time.time()
+            for job in due_jobs:
+                next_run_time = get_next_run_time(job, metadata)
+                if next_run_time <= now:
+                    # The run failed before recording anything; don't spin on it.
+                    next_run_time = now + min(DAEMON_RETRY_SECONDS, parse_frequency(job['frequency']))
+                heapq.heappush(schedule, (next_run_time, job['name'], job))
+            continue
+
+        if now - last_batch_poll >= LLM_BATCH_POLL_SECONDS:
+            # Batches submitted by earlier runs finish even while no job is due.
+            last_batch_poll = now
+            run_llm_batch_step(collect_llm_batches)
+            run_llm_batch_step(submit_llm_batches)
+            retry_outbox_emails()
+
+        delay = DAEMON_POLL_SECONDS
+        if schedule:
+            delay = min(delay, schedule[0][0] - now)
+        flush_log()
+        stop_event.wait(max(delay, 0))
+
+
+def run_daemon(cpu_pool=False):
+    stop_event = threading.Event()
+
+    def request_stop(signum, frame):
+        log_message(f"Daemon received signal {signum}; stopping after the current job.")
+        stop_event.set()
+
+    signal.signal(signal.SIGTERM, request_stop)
+    signal.signal(signal.SIGINT, request_stop)
+
+    lock_file = open(CRON_LOCK_FILE, 'w')
+    try:
+        try:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            log_message("Another check_cron process is running; daemon waiting for the lock.")
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        # Holding the lock for the daemon's lifetime makes timer-driven
+        # check_cron runs skip instead of duplicating work.
+        log_message("Daemon started.")
+        if cpu_pool:
+            start_cpu_pool()
+        # The SMTP session stays open between runs; an idle drop is
+        # reconnected on the next send.
+        run_scheduler(stop_event)
+        log_message("Daemon stopped.")
+    finally:
+        try:
+            close_smtp_session()
+            stop_cpu_pool()
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+        finally:
+            lock_file.close()
+
 
 def search_jobs(query):
     jobs = parse_cron_file()
@@ -1767,7 +4198,7 @@ if __name__ == "__main__":
             elif args.command == "run":
                 run_job(args.name)
             elif args.command == "check_cron":
-                check_cron(args.force)
+                check_cron(args.force, args.cpu_pool)
             elif args.command == "list":
                 list_jobs(args.sort_by)
             elif args.command == "remove":
@@ -1790,15 +4221,27 @@ if __name__ == "__main__":
                 adjust_job_frequency(args.name, "unbump")
             elif args.command == "test":
                 test_job(args.name)
+            elif args.command == "daemon":
+                run_daemon(args.cpu_pool)
+            elif args.command == "pack_snapshots":
+                pack_snapshots(args.name)
+            elif args.command == "inspect_volatile":
+                inspect_volatile_lines(args.name)
+            elif args.command == "stats":
+                show_llm_stats(args.days, args.job)
+            elif args.command == "run-report":
+                show_run_report(args.last)
             elif args.command == "compare_wikis":
                 compare_wikis(args.subject, args.send_email)
             else:
                 parser.print_help()
     except Exception as e:
         error_message = f"Unexpected error: {str(e)}\n\nTraceback:\n{traceback.format_exc()}"
-        log_message(error_message)
+        log_message(error_message, error=True)
         try:
             send_error_email(error_message)
         except Exception as email_error:
             log_message(f"Could not send error notification: {str(email_error)}")
         raise
+    finally:
+        close_smtp_session()
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+# Microbenchmark for the visible-text extraction backends.
+# Usage: python tests/bench_html_backends.py [--rows N] [--repeat N]
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import gptcron
+
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'html_corpus')
+
+
+def build_large_page(rows):
+    with open(os.path.join(CORPUS_DIR, 'news_front_page.html'), 'r', encoding='utf-8') as f:
+        article = f.read()
+    body = ''.join(
+        f"<tr><td>Row {index}</td><td><a href='/item/{index}'>Item {index}</a></td>"
+        f"<td><span class='price'>${index % 97}.{index % 100:02d}</span></td></tr>\n"
+        for index in range(rows)
+    )
+    return article.replace('</main>', f"<table>{body}</table></main>")
+
+
+def time_backend(backend, html_content, repeat):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        lines = gptcron.extract_visible_lines_from_html(html_content, backend)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare html.parser and lxml extraction speed.')
+    parser.add_argument('--rows', type=int, default=20000, help='Table rows in the synthetic page')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per backend; the best is reported')
+    args = parser.parse_args()
+
+    if not gptcron.LXML_AVAILABLE:
+        print("lxml is not installed; nothing to compare.")
+        return
+
+    html_content = build_large_page(args.rows)
+    print(f"Page size: {len(html_content) / 1024 / 1024:.1f} MiB")
+    baseline_time, baseline_lines = time_backend('html.parser', html_content, args.repeat)
+    lxml_time, lxml_lines = time_backend('lxml', html_content, args.repeat)
+    print(f"html.parser: {baseline_time:.3f}s ({len(baseline_lines)} lines)")
+    print(f"lxml:        {lxml_time:.3f}s ({len(lxml_lines)} lines)")
+    print(f"Speedup:     {baseline_time / lxml_time:.1f}x, identical output: {baseline_lines == lxml_lines}")
+
+
+if __name__ == '__main__':
+    main()
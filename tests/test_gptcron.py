@@ -1,20 +1,33 @@
+import difflib
+import gzip
+import http.server
+import io
 import json
 import os
 import tempfile
+import threading
+import time
 import unittest
 from types import SimpleNamespace
 from unittest.mock import Mock, patch
 
 import gptcron
 
+HTML_CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "html_corpus")
 
 class GptCronTestCase(unittest.TestCase):
     def setUp(self):
         self.original_directory = os.getcwd()
         self.temporary_directory = tempfile.TemporaryDirectory()
         os.chdir(self.temporary_directory.name)
+        gptcron._llm_clients.clear()
+        gptcron._llm_cache_stats.clear()
+        gptcron._llm_usage_totals.clear()
+        gptcron._job_timings.clear()
 
     def tearDown(self):
+        gptcron.close_smtp_session()
+        gptcron.close_log()
         os.chdir(self.original_directory)
         self.temporary_directory.cleanup()
 
@@ -74,7 +87,7 @@ class ConfigAndProviderTests(GptCronTestCase):
             result = gptcron.call_llm("prompt", response_format={"type": "json_object"})
 
         self.assertEqual(result, '{"ok": true}')
-        openai_client.assert_called_once_with(api_key="openai-key")
+        openai_client.assert_called_once_with(api_key="openai-key", max_retries=0)
         client.chat.completions.create.assert_called_once()
 
     def test_anthropic_provider_path(self):
@@ -99,6 +112,40 @@ class ConfigAndProviderTests(GptCronTestCase):
         sent_prompt = client.messages.create.call_args.kwargs["messages"][0]["content"]
         self.assertIn("Respond ONLY with valid JSON", sent_prompt)
 
+    def test_diff_summary_rubric_is_a_cached_anthropic_system_block(self):
+        client = Mock()
+        client.messages.create.return_value = SimpleNamespace(
+            content=[SimpleNamespace(text='{"brief summary": "b", "summary": "s", "score": 4}')],
+            usage=SimpleNamespace(
+                input_tokens=120, output_tokens=30,
+                cache_creation_input_tokens=None, cache_read_input_tokens=900
+            )
+        )
+        anthropic_module = SimpleNamespace(Anthropic=Mock(return_value=client))
+        config = {
+            "default_model": "claude-test",
+            "fallback_model": None,
+            "openai_api_key": None,
+            "anthropic_api_key": "anthropic-key"
+        }
+        document = {'lines': ['Heading', 'Price 10']}
+
+        with patch.object(gptcron, "get_model_config", return_value=config), \
+                patch.object(gptcron, "ANTHROPIC_AVAILABLE", True), \
+                patch.object(gptcron, "anthropic", anthropic_module):
+            summary, score, _ = gptcron.summarize_diff(
+                "+ Price 10", "", document, "https://example.com", "job"
+            )
+
+        self.assertEqual((summary, score), ("s", 4))
+        request = client.messages.create.call_args.kwargs
+        self.assertEqual(request["system"][0]["cache_control"], {"type": "ephemeral"})
+        self.assertIn("significant a change is", request["system"][0]["text"])
+        self.assertNotIn("significant a change is", request["messages"][0]["content"])
+        self.assertEqual(gptcron._llm_usage_totals, {
+            'calls': 1, 'input': 120, 'output': 30, 'cache_write': 0, 'cache_read': 900
+        })
+
     def test_provider_failure_falls_back_to_openai(self):
         anthropic_client = Mock()
         anthropic_client.messages.create.side_effect = RuntimeError("provider unavailable")
@@ -123,6 +170,186 @@ class ConfigAndProviderTests(GptCronTestCase):
 
         self.assertEqual(result, "fallback result")
 
+    def test_llm_client_is_reused_until_key_changes(self):
+        completion = SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content="result"))]
+        )
+        client = Mock()
+        client.chat.completions.create.return_value = completion
+        self.write_config(default_model="gpt-test", fallback_model=None)
+
+        with patch.object(gptcron, "OpenAI", return_value=client) as openai_client:
+            gptcron.call_llm("first")
+            gptcron.call_llm("second")
+            self.assertEqual(openai_client.call_count, 1)
+
+            self.write_config(default_model="gpt-test", fallback_model=None, openai_api_key="rotated-key")
+            gptcron.call_llm("third")
+
+        self.assertEqual(openai_client.call_args.kwargs, {"api_key": "rotated-key", "max_retries": 0})
+        self.assertEqual(client.chat.completions.create.call_count, 3)
+
+    def test_batch_calls_use_a_client_with_sdk_retries(self):
+        config = {"openai_api_key": "openai-key"}
+
+        with patch.object(gptcron, "OpenAI", side_effect=[Mock(), Mock()]) as openai_client:
+            batch_client = gptcron.get_provider_client("openai", config)
+            call_client = gptcron.get_provider_client("openai", config, max_retries=0)
+            self.assertIs(gptcron.get_provider_client("openai", config), batch_client)
+
+        self.assertIsNot(batch_client, call_client)
+        self.assertEqual(
+            [call.kwargs for call in openai_client.call_args_list],
+            [{"api_key": "openai-key"}, {"api_key": "openai-key", "max_retries": 0}]
+        )
+
+    def test_llm_requests_are_retried_and_recorded_for_stats(self):
+        overloaded = RuntimeError("overloaded")
+        overloaded.status_code = 529
+        completion = SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content="result"))],
+            usage=SimpleNamespace(
+                prompt_tokens=1200, completion_tokens=80,
+                prompt_tokens_details=SimpleNamespace(cached_tokens=1000)
+            )
+        )
+        client = Mock()
+        client.chat.completions.create.side_effect = [overloaded, completion]
+        self.write_config(default_model="gpt-test", fallback_model=None, llm_prices={"gpt-": [2, 10, 2, 1]})
+
+        with patch.object(gptcron, "OpenAI", return_value=client), \
+                patch.object(gptcron.time, "sleep") as sleep:
+            self.assertEqual(gptcron.call_llm("prompt", job="news"), "result")
+            client.chat.completions.create.side_effect = ValueError("bad request")
+            with self.assertRaises(ValueError):
+                gptcron.call_llm("prompt", job="news")
+
+        sleep.assert_called_once_with(1)
+        first, second = gptcron.load_llm_metrics(0)
+        self.assertEqual(
+            (first['job'], first['model'], first['input'], first['cache_read'], first['output'], first['retries'], first['ok']),
+            ("news", "gpt-test", 200, 1000, 80, 1, True)
+        )
+        self.assertEqual((second['retries'], second['ok']), (0, False))
+        self.assertAlmostEqual(gptcron.get_llm_cost(first, {"gpt-": [2, 10, 2, 1]}), 0.0022)
+
+        with patch("sys.stdout", new_callable=io.StringIO) as output:
+            gptcron.show_llm_stats(days=1)
+        report = output.getvalue()
+        self.assertIn("LLM requests in the last 1 day(s): 2", report)
+        self.assertIn("news", report)
+
+    def test_log_is_buffered_and_rotated_into_gzip_backups(self):
+        self.write_config(log_max_bytes=300, log_backup_count=2)
+
+        with patch("sys.stdout", new_callable=io.StringIO) as output:
+            for number in range(10):
+                gptcron.log_message(f"message {number:02d} " + "x" * 40)
+            self.assertFalse(os.path.exists(gptcron.LOG_FILE))
+            gptcron.log_message("something failed", error=True)
+
+        self.assertIn("message 00", output.getvalue())
+        self.assertEqual(
+            sorted(os.listdir(".")),
+            ["config.json", "log.log", "log.log.1.gz", "log.log.2.gz"]
+        )
+        with gzip.open("log.log.1.gz", "rt", encoding="utf-8") as backup:
+            self.assertIn("message 0", backup.read())
+        with open(gptcron.LOG_FILE, encoding="utf-8") as log_file:
+            self.assertTrue(log_file.read().endswith("something failed\n"))
+
+    def test_config_is_parsed_once_until_file_changes(self):
+        self.write_config()
+
+        with patch.object(gptcron.json, "load", wraps=gptcron.json.load) as json_load:
+            gptcron.load_config()
+            gptcron.load_config()["to_email"] = "mutated@example.com"
+            self.assertEqual(json_load.call_count, 1)
+            self.assertEqual(gptcron.load_config()["to_email"], "recipient@example.com")
+
+            self.write_config(to_email="changed@example.com")
+            self.assertEqual(gptcron.load_config()["to_email"], "changed@example.com")
+            self.assertEqual(json_load.call_count, 2)
+
+    def test_llm_cache_reuses_conforming_answers_only(self):
+        answer = '{"summary": "details", "brief summary": "brief", "score": 5}'
+        client = Mock()
+        client.chat.completions.create.return_value = SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=answer))]
+        )
+        self.write_config(default_model="gpt-test", fallback_model=None)
+
+        with patch.object(gptcron, "OpenAI", return_value=client):
+            first = gptcron.summarize_page("page text", "https://example.com", "site", {"name": "site"})
+            second = gptcron.summarize_page("page text", "https://example.com", "site", {"name": "site"})
+            self.assertEqual(client.chat.completions.create.call_count, 1)
+
+            # A stored answer that no longer validates is dropped, not reused.
+            cache_path = os.path.join(gptcron.LLM_CACHE_DIR, os.listdir(gptcron.LLM_CACHE_DIR)[0])
+            with open(cache_path, "w", encoding="utf-8") as cache_file:
+                json.dump({"created": time.time(), "response": '{"summary": "no score"}'}, cache_file)
+            gptcron.summarize_page("page text", "https://example.com", "site", {"name": "site"})
+
+        self.assertEqual(first, second)
+        self.assertEqual(client.chat.completions.create.call_count, 2)
+        self.assertEqual(gptcron._llm_cache_stats["hits"], 1)
+        self.assertEqual(gptcron._llm_cache_stats["misses"], 2)
+        self.assertEqual(gptcron._llm_cache_stats["discarded"], 1)
+
+    def test_llm_cache_expires_and_evicts_least_recently_used(self):
+        self.write_config(llm_cache_ttl_seconds=60, llm_cache_max_entries=2)
+        accept = lambda response_text: True
+        os.makedirs(gptcron.LLM_CACHE_DIR)
+
+        gptcron.write_llm_cache("a", "gpt-test", "A")
+        gptcron.write_llm_cache("b", "gpt-test", "B")
+        os.utime(os.path.join(gptcron.LLM_CACHE_DIR, "a.json"), (1, 1))
+        self.assertEqual(gptcron.read_llm_cache("b", accept), "B")
+        gptcron.write_llm_cache("c", "gpt-test", "C")
+
+        self.assertEqual(sorted(os.listdir(gptcron.LLM_CACHE_DIR)), ["b.json", "c.json"])
+        with patch.object(gptcron.time, "time", return_value=time.time() + 120):
+            self.assertIsNone(gptcron.read_llm_cache("c", accept))
+        self.assertEqual(gptcron._llm_cache_stats["evicted"], 1)
+
+    def test_llm_cache_eviction_tolerates_concurrent_writers(self):
+        self.write_config(llm_cache_max_entries=5)
+        accept = lambda response_text: True
+        os.makedirs(gptcron.LLM_CACHE_DIR)
+        errors = []
+
+        def write_and_read(worker):
+            try:
+                for index in range(40):
+                    key = f"{worker}-{index}"
+                    gptcron.write_llm_cache(key, "gpt-test", key)
+                    gptcron.read_llm_cache(f"{worker}-{index - 1}", accept)
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=write_and_read, args=(worker,)) for worker in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertLessEqual(len(os.listdir(gptcron.LLM_CACHE_DIR)), 5)
+
+    def test_llm_cache_write_failure_still_returns_answer(self):
+        answer = '{"summary": "details", "brief summary": "brief", "score": 5}'
+        client = Mock()
+        client.chat.completions.create.return_value = SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=answer))]
+        )
+        self.write_config(default_model="gpt-test", fallback_model=None)
+
+        with patch.object(gptcron, "OpenAI", return_value=client), \
+                patch.object(gptcron, "write_llm_cache", side_effect=FileNotFoundError("evicted")):
+            result = gptcron.summarize_page("page text", "https://example.com", "site", {"name": "site"})
+
+        self.assertEqual(result, ("details", "brief"))
+
     def test_unknown_model_fails_clearly(self):
         with self.assertRaisesRegex(ValueError, "Unsupported model"):
             gptcron.get_model_provider("gemini-test")
@@ -209,6 +436,175 @@ class JsonAndDiffTests(GptCronTestCase):
 
         self.assertEqual(diff_text, "ADDED: Now available")
 
+    def test_prompt_for_small_change_sends_nearby_context_only(self):
+        page = [f"Paragraph {index} about the topic" for index in range(3000)]
+        page[1500] = "Paragraph 1500 was rewritten"
+        diff_text = "REMOVED: Paragraph 1500 about the topic\r\nADDED: Paragraph 1500 was rewritten"
+
+        prompt = gptcron.build_diff_summary_prompt(
+            diff_text, {"lines": page, "text": " ".join(page)}, "https://example.com"
+        )
+
+        self.assertIn("Paragraph 0 about the topic", prompt)
+        self.assertIn("Paragraph 1498 about the topic\nParagraph 1499 about the topic\nParagraph 1500 was rewritten", prompt)
+        self.assertNotIn("Paragraph 900 about", prompt)
+        self.assertLess(gptcron.estimate_tokens(prompt), 1000)
+
+    def test_prompt_budget_is_small_only_for_legacy_gpt4(self):
+        budgets = {
+            model: gptcron.get_prompt_token_budget(model)
+            for model in ["gpt-4", "gpt-4-0613", "gpt-4.1", "gpt-4.5-preview", "gpt-4o", "gpt-4-turbo", "claude-test"]
+        }
+
+        self.assertEqual(budgets["gpt-4"], 4000)
+        self.assertEqual(budgets["gpt-4-0613"], 4000)
+        for model in ["gpt-4.1", "gpt-4.5-preview", "gpt-4o", "gpt-4-turbo", "claude-test"]:
+            self.assertEqual(budgets[model], gptcron.DEFAULT_PROMPT_TOKEN_BUDGET)
+
+    def test_prompt_budget_keeps_biggest_hunks_and_reports_the_rest(self):
+        self.write_config(prompt_token_budget=1000)
+        page = [f"Line {index}" for index in range(100)]
+        small_hunks = [f"ADDED: Small {index}" for index in range(40)]
+        big_hunk = [f"REMOVED: Old paragraph {index} " + "x" * 60 for index in range(30)]
+        diff_text = "\r\n".join(
+            line for pair in zip(small_hunks, ["REMOVED: gap"] * 40) for line in pair
+        ) + "\r\n" + "\r\n".join(big_hunk)
+
+        prompt = gptcron.build_diff_summary_prompt(diff_text, {"lines": page, "text": ""}, "https://example.com")
+
+        self.assertIn("Old paragraph 0 ", prompt)
+        self.assertNotIn("Small 39", prompt)
+        self.assertRegex(prompt, r"\[\d+ more changed line\(s\) omitted to fit the prompt budget\]")
+        self.assertLessEqual(gptcron.estimate_tokens(prompt), 1000)
+
+    def test_oversized_diff_is_summarized_in_concurrent_parts_then_merged(self):
+        self.write_config(prompt_token_budget=1500)
+        page = [f"Story {index}: " + "word " * 20 for index in range(200)]
+        diff_text = "\r\n".join(f"ADDED: {line}" for line in page)
+        prompts = []
+        active = [0, 0]
+        lock = threading.Lock()
+
+        def fake_call_llm(prompt, **kwargs):
+            with lock:
+                prompts.append(prompt)
+                active[0] += 1
+                active[1] = max(active[1], active[0])
+            time.sleep(0.02)
+            with lock:
+                active[0] -= 1
+            if "Merge the part summaries" in prompt:
+                return '{"summary": "Merged", "brief summary": "Redesign", "score": 8}'
+            return '{"summary": "Part", "brief summary": "Some stories", "score": 5}'
+
+        with patch.object(gptcron, "call_llm", side_effect=fake_call_llm):
+            result = gptcron.summarize_diff(
+                diff_text, "", {"lines": page, "text": ""}, "https://example.com", "site"
+            )
+
+        self.assertEqual(result, ("Merged", 8, "Redesign"))
+        part_prompts = [prompt for prompt in prompts if "Merge the part summaries" not in prompt]
+        self.assertGreater(len(part_prompts), 2)
+        self.assertGreater(active[1], 1)
+        for line in page:
+            self.assertTrue(any(f"ADDED: {line}" in prompt for prompt in part_prompts), line)
+        self.assertFalse(any("omitted to fit the prompt budget" in prompt for prompt in part_prompts))
+        self.assertIn(f"Part {len(part_prompts)} of {len(part_prompts)} (score 5): Some stories", prompts[-1])
+
+    def test_prompt_budget_below_the_instructions_is_rejected_and_merges_still_finish(self):
+        self.write_config(prompt_token_budget=300)
+        with self.assertRaisesRegex(ValueError, "prompt_token_budget"):
+            gptcron.get_prompt_char_budgets("https://example.com")
+
+        # A URL long enough to eat the whole budget still leaves room to merge in.
+        self.write_config(prompt_token_budget=1000)
+        url = "https://example.com/?q=" + "x" * 4000
+        parts = [(f"Details of part {index}: " + "detail " * 150, 5, f"Part {index}") for index in range(6)]
+        with patch.object(
+            gptcron, "call_llm",
+            return_value='{"summary": "merged", "brief summary": "Merged", "score": 5}'
+        ) as call_llm:
+            result = gptcron.merge_diff_summaries(parts, url, "site")
+            chunks = gptcron.get_diff_summary_chunks("ADDED: one\r\nADDED: two", {"lines": [], "text": ""}, url)
+
+        self.assertEqual(result[1:], (5, "Merged"))
+        self.assertLess(call_llm.call_count, len(parts))
+        self.assertEqual(chunks, ["ADDED: one\r\nADDED: two"])
+
+    def test_part_summaries_are_merged_in_rounds_within_the_budget(self):
+        self.write_config(prompt_token_budget=1500)
+        parts = [(f"Details of part {index}: " + "detail " * 150, 5, f"Part {index}") for index in range(12)]
+        prompts = []
+        lock = threading.Lock()
+
+        def fake_call_llm(prompt, **kwargs):
+            with lock:
+                prompts.append(prompt)
+            return '{"summary": "' + "merged " * 150 + '", "brief summary": "Merged", "score": 7}'
+
+        with patch.object(gptcron, "call_llm", side_effect=fake_call_llm):
+            result = gptcron.merge_diff_summaries(parts, "https://example.com", "site")
+
+        self.assertEqual(result[1:], (7, "Merged"))
+        self.assertGreater(len(prompts), 2)
+        for prompt in prompts:
+            self.assertLessEqual(gptcron.estimate_tokens(gptcron.DIFF_SUMMARY_SYSTEM_PROMPT + prompt), 1500)
+        self.assertNotIn("Part 7 of", prompts[-1])
+
+    def test_hashed_diff_opcodes_rebuild_the_new_page(self):
+        old_lines = ["Menu", "Item 1", "Item 2", "Item 1", "Price $3", "Footer"]
+        new_lines = ["Menu", "Item 2", "Item 1", "Item 3", "Price $4", "Footer", "Extra"]
+
+        rebuilt = []
+        for tag, i1, i2, j1, j2 in gptcron.diff_line_opcodes(old_lines, new_lines):
+            if tag == "equal":
+                self.assertEqual(old_lines[i1:i2], new_lines[j1:j2])
+            rebuilt.extend(new_lines[j1:j2])
+
+        self.assertEqual(rebuilt, new_lines)
+
+    def test_hashed_and_difflib_engines_agree_on_changed_lines(self):
+        old_lines = [
+            "Read more" if index % 5 == 0 else f"Headline number {index}" for index in range(150)
+        ]
+        new_lines = list(old_lines)
+        new_lines[10] = "Breaking: new row"
+        del new_lines[60]
+        new_lines.insert(120, "Inserted line")
+
+        hashed_diff, hashed_all = gptcron.diff_lines_with_hashes(old_lines, new_lines)
+        difflib_diff, _ = gptcron.diff_lines_with_difflib(old_lines, new_lines)
+
+        self.assertEqual(sorted(hashed_diff.split("\r\n")), sorted(difflib_diff.split("\r\n")))
+        self.assertIn("Breaking: new row", hashed_all)
+
+    def test_hashed_diff_keeps_unchanged_lines_past_the_myers_edit_cap(self):
+        old_lines = ["Row"] * 600
+        new_lines = list(old_lines)
+        for index in range(5, 600, 8):
+            new_lines[index] = f"Changed {index}"
+        changed = len(range(5, 600, 8))
+
+        with patch.object(gptcron, "MYERS_MAX_EDITS", 20):
+            diff_text, _ = gptcron.diff_lines_with_hashes(old_lines, new_lines)
+
+        diff_lines = diff_text.split("\r\n")
+        self.assertEqual(len(diff_lines), 2 * changed)
+        self.assertEqual(diff_lines.count("REMOVED: Row"), changed)
+        self.assertIn("ADDED: Changed 597", diff_lines)
+
+    def test_diff_engine_flag_selects_difflib(self):
+        self.write_config(diff_engine="difflib")
+        old_file = self.write_snapshot("site", "20260101-00-00-00", "<p>Old</p>")
+        new_file = self.write_snapshot("site", "20260102-00-00-00", "<p>New</p>")
+
+        with patch.object(gptcron, "_diff_engine", None), \
+                patch.object(gptcron, "diff_lines_with_hashes") as hashed:
+            diff_text, _ = gptcron.compare_files(old_file, new_file)
+
+        hashed.assert_not_called()
+        self.assertEqual(diff_text, "REMOVED: Old\r\nADDED: New")
+
     def test_email_diff_highlighting_matches_diff_labels(self):
         old_file = self.write_snapshot("site", "20260101-00-00-00", "<p>Old</p>")
         new_file = self.write_snapshot("site", "20260102-00-00-00", "<p>New</p>")
@@ -230,6 +626,48 @@ class JsonAndDiffTests(GptCronTestCase):
         self.assertIn("a=1&amp;b=2", body)
 
 
+class HtmlBackendTests(GptCronTestCase):
+    @unittest.skipUnless(gptcron.LXML_AVAILABLE, "lxml is not installed")
+    def test_lxml_backend_matches_html_parser_on_corpus(self):
+        for filename in sorted(os.listdir(HTML_CORPUS_DIR)):
+            with self.subTest(page=filename):
+                with open(os.path.join(HTML_CORPUS_DIR, filename), encoding="utf-8") as page:
+                    html_content = page.read()
+                reference = gptcron.extract_visible_lines_from_html(html_content, "html.parser")
+                candidate = gptcron.extract_visible_lines_from_html(html_content, "lxml")
+
+                matcher = difflib.SequenceMatcher(a=reference, b=candidate, autojunk=False)
+                differing = sum(
+                    max(i2 - i1, j2 - j1)
+                    for tag, i1, i2, j1, j2 in matcher.get_opcodes() if tag != "equal"
+                )
+                self.assertGreater(len(reference), 5)
+                self.assertLessEqual(differing, max(1, len(reference) // 20))
+                for hidden in ("dataLayer", "font-family", "Template text", "enable JavaScript", "header starts"):
+                    self.assertNotIn(hidden, " ".join(candidate))
+
+    @unittest.skipUnless(gptcron.LXML_AVAILABLE, "lxml is not installed")
+    def test_lxml_backend_falls_back_on_unparseable_input(self):
+        html_content = '<?xml version="1.0" encoding="utf-8"?><html><body><p>Text</p></body></html>'
+
+        self.assertEqual(gptcron.extract_visible_lines_from_html(html_content, "lxml"), ["Text"])
+        self.assertEqual(gptcron.extract_visible_lines_from_html("  ", "lxml"), [])
+
+    def test_backend_comes_from_config_or_auto(self):
+        expected_auto = "lxml" if gptcron.LXML_AVAILABLE else "html.parser"
+        with patch.object(gptcron, "_html_parser_backend", None):
+            self.assertEqual(gptcron.get_html_parser_backend(), expected_auto)
+
+        self.write_config(html_parser="html.parser")
+        with patch.object(gptcron, "_html_parser_backend", None):
+            self.assertEqual(gptcron.get_html_parser_backend(), "html.parser")
+
+        self.write_config(html_parser="regex")
+        with patch.object(gptcron, "_html_parser_backend", None):
+            with self.assertRaisesRegex(ValueError, "Invalid html_parser"):
+                gptcron.get_html_parser_backend()
+
+
 class StateAndEmailTests(GptCronTestCase):
     def test_smtp_failure_is_propagated(self):
         self.write_config()
@@ -238,6 +676,38 @@ class StateAndEmailTests(GptCronTestCase):
             with self.assertRaises(gptcron.EmailDeliveryError):
                 gptcron.inner_send_email("subject", "body", "recipient@example.com")
 
+    def test_smtp_session_is_reused_and_reopened_when_dropped(self):
+        self.write_config()
+        first, second = Mock(), Mock()
+        first.sendmail.side_effect = [None, gptcron.smtplib.SMTPServerDisconnected("idle timeout")]
+
+        with patch.object(gptcron.smtplib, "SMTP", side_effect=[first, second]) as smtp:
+            gptcron.inner_send_email("one", "body", "recipient@example.com")
+            gptcron.inner_send_email("two", "body", "recipient@example.com")
+            self.assertEqual(smtp.call_count, 2)
+            first.login.assert_called_once()
+            self.assertEqual(second.sendmail.call_count, 1)
+            gptcron.close_smtp_session()
+
+        second.quit.assert_called_once()
+        self.assertIsNone(gptcron._smtp_session)
+
+    def test_smtp_session_outlives_a_run_and_closes_with_check_cron(self):
+        self.write_config()
+        session = Mock()
+
+        with patch.object(gptcron.smtplib, "SMTP", return_value=session) as smtp:
+            gptcron.inner_send_email("one", "body", "recipient@example.com")
+            gptcron.run_due_jobs([], 0, {})
+            self.assertIs(gptcron._smtp_session, session)
+            gptcron.inner_send_email("two", "body", "recipient@example.com")
+            self.assertEqual(smtp.call_count, 1)
+
+            gptcron.check_cron()
+
+        session.quit.assert_called_once()
+        self.assertIsNone(gptcron._smtp_session)
+
     def test_failed_email_is_not_archived_as_sent(self):
         with patch.object(
             gptcron, "inner_send_email", side_effect=gptcron.EmailDeliveryError("failed")
@@ -293,6 +763,145 @@ class StateAndEmailTests(GptCronTestCase):
             gptcron.load_metadata()["site"]["last_emailed_version"], baseline
         )
 
+    def test_builtin_normalizers_mask_dynamic_tokens(self):
+        lines = [
+            "Updated 2026-01-02T10:15:00Z by staff",
+            "Posted 5 minutes ago at 10:15 am",
+            "1,204 views",
+            "csrf_token=a8f9c0 /static/app.js?v=1234",
+            "Price $4",
+            "Last updated: 10:15 am",
+            "Open daily 7:00 am - 5:00 pm",
+            "Event on 2026-10-20 18:00"
+        ]
+
+        normalized, fired = gptcron.normalize_lines(lines, gptcron.DYNAMIC_TOKEN_RULES)
+
+        self.assertEqual(normalized, [
+            "Updated <timestamp> by staff",
+            "Posted <time ago> at 10:15 am",
+            "<count> views",
+            "csrf_token=<token> /static/app.js?v=<cachebust>",
+            "Price $4",
+            "Last updated: <time>",
+            "Open daily 7:00 am - 5:00 pm",
+            "Event on 2026-10-20 18:00"
+        ])
+        self.assertEqual(fired["relative_time"], 1)
+        self.assertEqual(fired["clock_time"], 1)
+        self.assertNotIn("hex_token", fired)
+
+    def test_masked_lines_only_decide_equality_and_diff_keeps_real_text(self):
+        baseline = self.write_snapshot(
+            "site", "20260101-00-00-00",
+            "<p>Updated 9:00 am</p><p>Open daily 7:00 am - 5:00 pm</p><p>Story</p>"
+        )
+        latest = self.write_snapshot(
+            "site", "20260102-00-00-00",
+            "<p>Updated 11:30 am</p><p>Open daily 9:30 am - 2:00 pm</p><p>Story</p>"
+        )
+        rules = gptcron.get_normalizer_rules("site")
+
+        for engine in gptcron.DIFF_ENGINES:
+            with self.subTest(engine=engine), patch.object(gptcron, "get_diff_engine", return_value=engine):
+                diff_text, all_text = gptcron.compare_files(baseline, latest, rules=rules)
+                self.assertEqual(
+                    diff_text,
+                    "REMOVED: Open daily 7:00 am - 5:00 pm\r\nADDED: Open daily 9:30 am - 2:00 pm"
+                )
+                self.assertIn("Updated 11:30 am", all_text)
+
+    def test_masked_only_changes_skip_summary_and_record_savings(self):
+        self.write_config(normalize_rules={"site": [{"name": "visitors", "pattern": r"Visitor #\d+", "replace": "Visitor #N"}]})
+        baseline = self.write_snapshot(
+            "site", "20260101-00-00-00", "<p>Story</p><p>3 minutes ago</p><p>Visitor #17</p>"
+        )
+        latest = self.write_snapshot(
+            "site", "20260102-00-00-00", "<p>Story</p><p>9 minutes ago</p><p>Visitor #18</p>"
+        )
+        gptcron.save_metadata({"site": {"last_emailed_version": baseline}})
+
+        with patch.object(gptcron, "summarize_diff") as summarize_diff:
+            result = gptcron.process_downloaded_job({"name": "site", "url": "https://example.com"}, latest)
+
+        self.assertFalse(result)
+        summarize_diff.assert_not_called()
+        with open(gptcron.NORMALIZER_STATS_FILE, encoding="utf-8") as stats_file:
+            stats = json.load(stats_file)
+        self.assertEqual(stats["relative_time"], {"fired": 1, "saved": 1})
+        self.assertEqual(stats["visitors"], {"fired": 1, "saved": 1})
+
+    def test_rotating_lines_become_volatile_but_one_off_changes_do_not(self):
+        state = {"transitions": 0, "last_file": None, "lines": {}}
+        snapshots = [
+            ["Story", f"Headline {index // 4}", f"Trending: item {index % 3}"]
+            for index in range(12)
+        ]
+        for previous, current in zip(snapshots, snapshots[1:]):
+            gptcron.update_line_volatility(state, previous, current)
+
+        volatile = gptcron.get_volatile_fingerprints(state)
+
+        fingerprint = gptcron.get_line_fingerprint
+        self.assertIn(fingerprint("Trending: item 1"), volatile)
+        self.assertNotIn(fingerprint("Headline 1"), volatile)
+        self.assertNotIn(fingerprint("Story"), state["lines"])
+
+    def test_volatile_lines_are_learned_from_history_and_left_out_of_diff(self):
+        self.write_config(normalize_builtin=False)
+        for day in range(1, 11):
+            self.write_snapshot(
+                "site", f"202601{day:02d}-00-00-00",
+                f"<p>Story</p><p>Ad slot {day % 2}</p>"
+            )
+        baseline = gptcron.get_snapshot_versions("site")[-1][1]
+        latest = self.write_snapshot(
+            "site", "20260111-00-00-00", "<p>Story</p><p>Ad slot 1</p><p>Real news</p>"
+        )
+        gptcron.save_metadata({"site": {"last_emailed_version": baseline}})
+
+        with patch.object(
+            gptcron, "summarize_diff", return_value=("Summary", 3, "Brief")
+        ) as summarize_diff, patch("builtins.print") as printed:
+            gptcron.process_downloaded_job({"name": "site", "url": "https://example.com"}, latest)
+            gptcron.inspect_volatile_lines("site")
+
+        self.assertEqual(summarize_diff.call_args.args[0], "ADDED: Real news")
+        state = gptcron.load_job_volatility("site")
+        self.assertEqual(state["transitions"], 10)
+        self.assertEqual(state["last_file"], latest)
+        output = "\n".join(call.args[0] for call in printed.call_args_list if call.args)
+        self.assertIn("site: 2 suppressed line(s) over 10 snapshot transition(s)", output)
+        self.assertIn("Ad slot 0", output)
+
+    def test_changed_page_is_parsed_once_and_shared_with_summary(self):
+        self.write_config()
+        pages = [
+            ("20260101-00-00-00-000000", "<html><body><p>Old</p></body></html>"),
+            ("20260102-00-00-00-000000", "<html><body><h1>Title</h1><p>New</p></body></html>"),
+        ]
+        baseline, latest = [
+            gptcron.save_snapshot(
+                f"data/site/site-{timestamp}.html", html_content,
+                gptcron.extract_visible_lines_from_html(html_content)
+            )
+            for timestamp, html_content in pages
+        ]
+        gptcron.save_metadata({"site": {"last_emailed_version": baseline}})
+
+        with patch.object(gptcron, "extract_visible_lines_from_html") as extract, \
+                patch.object(gptcron, "read_snapshot") as read_snapshot, \
+                patch.object(
+                    gptcron, "summarize_diff", return_value=("Summary", 2, "Brief")
+                ) as summarize_diff:
+            gptcron.process_downloaded_job({"name": "site", "url": "https://example.com"}, latest)
+
+        extract.assert_not_called()
+        read_snapshot.assert_not_called()
+        document = summarize_diff.call_args.args[2]
+        self.assertEqual(document["text"], "Title New")
+        self.assertEqual(document["size"], len(pages[1][1]))
+
     def test_missing_metadata_uses_oldest_snapshot_for_aggregation(self):
         self.write_config()
         baseline = self.write_snapshot(
@@ -344,11 +953,11 @@ class StateAndEmailTests(GptCronTestCase):
             "data", "site", "site-20260102-00-00-00-000001.html"
         )
 
-        def fake_download(url, name):
+        def fake_download(url, name, validators=None, previous_hash=None):
             os.makedirs(os.path.dirname(downloaded_path), exist_ok=True)
             with open(downloaded_path, "w", encoding="utf-8") as downloaded:
                 downloaded.write("<p>content</p>")
-            return downloaded_path
+            return downloaded_path, {}, "hash"
 
         with patch.object(gptcron, "download_url", side_effect=fake_download), \
                 patch.object(gptcron, "process_downloaded_job", side_effect=ValueError("bad AI")):
@@ -357,6 +966,137 @@ class StateAndEmailTests(GptCronTestCase):
 
         self.assertFalse(os.path.exists(downloaded_path))
 
+    def test_download_sends_validators_and_short_circuits_on_304(self):
+        response = Mock(status_code=304, headers={})
+
+        with patch.object(gptcron, "http_get", return_value=response) as get:
+            latest_file, validators, _ = gptcron.download_url(
+                "https://example.com", "site", {"etag": '"abc"', "last_modified": "Mon, 01 Jan 2026 00:00:00 GMT"}
+            )
+
+        headers = get.call_args.kwargs["headers"]
+        self.assertEqual(headers["If-None-Match"], '"abc"')
+        self.assertEqual(headers["If-Modified-Since"], "Mon, 01 Jan 2026 00:00:00 GMT")
+        self.assertIsNone(latest_file)
+        self.assertEqual(validators["etag"], '"abc"')
+        self.assertEqual(os.listdir(os.path.join("data", "site")), [])
+
+    def test_not_modified_run_records_check_without_processing(self):
+        self.write_job()
+        self.write_snapshot("site", "20260101-00-00-00", "<html><body>Old</body></html>")
+        gptcron.save_metadata({"site": {"validators": {"etag": '"abc"'}}})
+
+        with patch.object(
+            gptcron, "download_url", return_value=(None, {"etag": '"abc"'}, None)
+        ) as download, patch.object(gptcron, "process_downloaded_job") as process:
+            gptcron.run_cron_checks(force=True)
+
+        self.assertEqual(download.call_args.args[2], {"etag": '"abc"'})
+        process.assert_not_called()
+        job_state = gptcron.load_metadata()["site"]
+        self.assertEqual(job_state["validators"], {"etag": '"abc"'})
+        self.assertFalse(
+            gptcron.is_job_due({"name": "site", "frequency": "daily"}, time.time(), {"site": job_state})
+        )
+
+    def test_manual_run_compares_even_when_page_is_unchanged(self):
+        self.write_config()
+        self.write_job()
+        html_content = "<html><body>Same</body></html>"
+        baseline = self.write_snapshot("site", "20260101-00-00-00", "<html><body>Old</body></html>")
+        self.write_snapshot("site", "20260102-00-00-00", html_content)
+        gptcron.save_metadata({"site": {
+            "last_emailed_version": baseline,
+            "validators": {"etag": '"abc"'},
+            "content_hash": gptcron.hash_visible_lines(["Same"])
+        }})
+        response = Mock(status_code=200, headers={"ETag": '"abc"'}, text=html_content)
+
+        with patch.object(gptcron, "http_get", return_value=response) as get, \
+                patch.object(gptcron, "summarize_diff", return_value=("Summary", 3, "Brief")) as summarize_diff, \
+                patch.object(gptcron, "send_email"), \
+                patch("builtins.print"):
+            gptcron.test_job("site")
+
+        self.assertEqual(get.call_args.kwargs["headers"], {})
+        self.assertEqual(summarize_diff.call_args.args[0], "REMOVED: Old\r\nADDED: Same")
+
+    def test_due_check_reads_snapshot_catalog_only_without_last_checked(self):
+        self.write_snapshot("site", "20260101-00-00-00", "<html><body>Old</body></html>")
+        job = {"name": "site", "frequency": "daily"}
+        now = time.time()
+
+        with patch.object(gptcron, "load_snapshot_catalog", wraps=gptcron.load_snapshot_catalog) as catalog:
+            self.assertFalse(gptcron.is_job_due(job, now, {"site": {"last_checked": now - 60}}))
+            catalog.assert_not_called()
+            self.assertTrue(gptcron.is_job_due(job, now, {}))
+            catalog.assert_called_once()
+
+    def test_unchanged_visible_content_skips_snapshot_write(self):
+        html_content = "<html><script>tracker(1)</script><body><p>Same   text</p></body></html>"
+        previous_hash = gptcron.hash_visible_lines(["Same text"])
+        response = Mock(status_code=200, headers={"ETag": '"v2"'}, text=html_content)
+
+        with patch.object(gptcron, "http_get", return_value=response):
+            latest_file, validators, content_hash = gptcron.download_url(
+                "https://example.com", "site", None, previous_hash
+            )
+
+        self.assertIsNone(latest_file)
+        self.assertEqual(content_hash, previous_hash)
+        self.assertEqual(validators, {"etag": '"v2"'})
+        self.assertEqual(os.listdir(os.path.join("data", "site")), [])
+
+    def test_downloads_share_one_keep_alive_connection(self):
+        user_agents = []
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                user_agents.append(self.headers["User-Agent"])
+                body = b"<html><body><p>Hello</p></body></html>"
+                self.send_response(200)
+                self.send_header("Content-Length", str(len(body)))
+                self.send_header("Set-Cookie", "session=abc")
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{server.server_address[1]}/"
+
+        with patch.object(gptcron, "_http_session", None):
+            try:
+                gptcron.download_url(url, "site")
+                self.assertIsNotNone(gptcron.fetch_page_content(url))
+                stats = gptcron.get_http_connection_stats()
+                stored_cookies = len(gptcron._http_session.cookies)
+            finally:
+                gptcron._http_session.close()
+                server.shutdown()
+                server.server_close()
+
+        self.assertEqual(stats, {"127.0.0.1": (2, 1)})
+        self.assertEqual(user_agents, [gptcron.USER_AGENT] * 2)
+        self.assertEqual(stored_cookies, 0)
+
+    def test_validators_are_not_saved_when_processing_fails(self):
+        self.write_job()
+
+        def fake_download(url, name, validators=None, previous_hash=None):
+            return self.write_snapshot(name, "20260102-00-00-00", "<p>content</p>"), {"etag": '"new"'}, "hash"
+
+        with patch.object(gptcron, "download_url", side_effect=fake_download), \
+                patch.object(gptcron, "process_downloaded_job", side_effect=ValueError("bad AI")):
+            with self.assertRaises(ValueError):
+                gptcron.run_job("site")
+
+        self.assertNotIn("site", gptcron.load_metadata())
+
     def test_snapshot_listing_ignores_unrelated_files(self):
         valid = self.write_snapshot(
             "site", "20260101-00-00-00", "<html><body>Valid</body></html>"
@@ -368,6 +1108,88 @@ class StateAndEmailTests(GptCronTestCase):
 
         self.assertEqual(latest, valid)
 
+    def test_snapshot_store_dedupes_and_compresses_identical_fetches(self):
+        first = gptcron.save_snapshot("data/site/site-20260101-00-00-00-000000.html", "<p>Same</p>" * 100)
+        second = gptcron.save_snapshot("data/site/site-20260102-00-00-00-000000.html", "<p>Same</p>" * 100)
+
+        blobs = os.listdir(os.path.join("data", "site", "blobs"))
+        self.assertEqual(len(blobs), 1)
+        self.assertLess(os.path.getsize(os.path.join("data", "site", "blobs", blobs[0])), 1100)
+        self.assertEqual(gptcron.read_snapshot(second), "<p>Same</p>" * 100)
+        self.assertEqual([path for _, path in gptcron.get_snapshot_versions("site")], [first, second])
+        self.assertEqual(gptcron.get_snapshot_time(second), gptcron.datetime(2026, 1, 2))
+
+        gptcron.delete_snapshot(second)
+        self.assertEqual(len(os.listdir(os.path.join("data", "site", "blobs"))), 1)
+        gptcron.delete_snapshot(first)
+        self.assertFalse(gptcron.snapshot_exists(first))
+        self.assertEqual(os.listdir(os.path.join("data", "site", "blobs")), [])
+
+    def test_pack_snapshots_moves_legacy_files_into_store(self):
+        legacy = self.write_snapshot("site", "20260101-00-00-00", "<html><body>Old</body></html>")
+        latest = gptcron.save_snapshot(
+            "data/site/site-20260102-00-00-00-000000.html", "<html><body>New</body></html>"
+        )
+
+        gptcron.pack_snapshots("site")
+
+        self.assertFalse(os.path.isfile(legacy))
+        self.assertTrue(gptcron.snapshot_exists(legacy))
+        diff_text, _ = gptcron.compare_files(legacy, latest)
+        self.assertEqual(diff_text, "REMOVED: Old\r\nADDED: New")
+
+    def test_compare_uses_cached_lines_instead_of_reparsing(self):
+        baseline_html = "<html><body><p>Old</p></body></html>"
+        latest_html = "<html><body><p>New</p></body></html>"
+        baseline = gptcron.save_snapshot(
+            "data/site/site-20260101-00-00-00-000000.html",
+            baseline_html, gptcron.extract_visible_lines_from_html(baseline_html)
+        )
+        latest = gptcron.save_snapshot(
+            "data/site/site-20260102-00-00-00-000000.html",
+            latest_html, gptcron.extract_visible_lines_from_html(latest_html)
+        )
+
+        with patch.object(gptcron, "extract_visible_lines_from_html") as extract:
+            diff_text, _ = gptcron.compare_files(baseline, latest)
+
+        extract.assert_not_called()
+        self.assertEqual(diff_text, "REMOVED: Old\r\nADDED: New")
+
+    def test_legacy_snapshot_lines_are_cached_after_first_parse(self):
+        legacy = self.write_snapshot("site", "20260101-00-00-00", "<p>Legacy</p>")
+
+        self.assertEqual(gptcron.get_snapshot_lines(legacy), ["Legacy"])
+        with patch.object(gptcron, "extract_visible_lines_from_html") as extract:
+            self.assertEqual(gptcron.get_snapshot_lines(legacy), ["Legacy"])
+
+        extract.assert_not_called()
+
+    def test_snapshot_index_avoids_directory_scans_once_built(self):
+        legacy = self.write_snapshot("site", "20260101-00-00-00", "<p>Legacy</p>")
+        stored = gptcron.save_snapshot(
+            "data/site/site-20260102-00-00-00-000000.html", "<p>Stored</p>", ["Stored"]
+        )
+        gptcron._snapshot_catalogs.clear()
+
+        with patch.object(gptcron.os, "listdir", side_effect=AssertionError("scanned")):
+            self.assertEqual(gptcron.get_last_file("site")[0], stored)
+            self.assertEqual(gptcron.get_oldest_snapshot("site", exclude=stored), legacy)
+            entry = gptcron.find_snapshot_entry(stored)
+
+        self.assertEqual(entry["size"], len("<p>Stored</p>"))
+        self.assertEqual(entry["content_hash"], gptcron.hash_visible_lines(["Stored"]))
+
+    def test_snapshot_index_drops_deleted_legacy_files(self):
+        first = self.write_snapshot("site", "20260101-00-00-00", "<p>One</p>")
+        second = self.write_snapshot("site", "20260102-00-00-00", "<p>Two</p>")
+        self.assertEqual(gptcron.get_last_file("site")[0], second)
+
+        os.remove(second)
+        gptcron._snapshot_catalogs.clear()
+
+        self.assertEqual([path for _, path in gptcron.get_snapshot_versions("site")], [first])
+
 
 class CronAndCliTests(GptCronTestCase):
     def test_cron_continues_after_one_job_fails(self):
@@ -378,11 +1200,89 @@ class CronAndCliTests(GptCronTestCase):
 
         with patch.object(gptcron, "parse_cron_file", return_value=jobs), \
                 patch.object(gptcron, "get_last_file", return_value=(None, None)), \
+                patch.object(gptcron, "download_url"), \
                 patch.object(gptcron, "run_job", side_effect=[ValueError("bad JSON"), True]) as run_job:
             gptcron.run_cron_checks(force=True)
 
         self.assertEqual(run_job.call_count, 2)
 
+    def test_failed_email_waits_in_outbox_and_is_sent_without_new_llm_call(self):
+        self.write_config()
+        self.write_job()
+        baseline = self.write_snapshot(
+            "site", "20260101-00-00-00", "<html><body>Old</body></html>"
+        )
+        gptcron.save_metadata({"site": {"last_emailed_version": baseline}})
+        response = Mock(status_code=200, headers={"ETag": '"v2"'}, text="<html><body>New</body></html>")
+
+        with patch.object(gptcron, "http_get", return_value=response), \
+                patch.object(gptcron, "summarize_diff", return_value=("Summary", 8, "Brief")) as summarize_diff, \
+                patch.object(gptcron, "inner_send_email", side_effect=gptcron.EmailDeliveryError("SMTP down")), \
+                patch.object(gptcron, "log_message") as log_message:
+            gptcron.run_cron_checks(force=True)
+
+        messages = [call.args[0] for call in log_message.call_args_list]
+        self.assertIn("Queued email for job site", messages)
+        self.assertTrue(any("Emails Sent: 0, Emails Failed: 1" in message for message in messages))
+        metadata = gptcron.load_metadata()["site"]
+        self.assertEqual(metadata["last_emailed_version"], baseline)
+        self.assertEqual(metadata["validators"], {"etag": '"v2"'})
+        latest = gptcron.get_snapshot_versions("site")[-1][1]
+        entry = gptcron.load_json_file(gptcron.get_outbox_path("site"))
+        self.assertEqual((entry["attempts"], entry["latest_file"]), (1, latest))
+        self.assertGreater(entry["next_attempt"], time.time() + gptcron.OUTBOX_RETRY_SECONDS - 60)
+        self.assertIsNone(gptcron._mail_queue)
+
+        # The page changes while the email is still waiting: nothing is diffed
+        # and the new snapshot is not recorded as seen.
+        response = Mock(status_code=200, headers={"ETag": '"v3"'}, text="<html><body>Newer</body></html>")
+        with patch.object(gptcron, "http_get", return_value=response), \
+                patch.object(gptcron, "summarize_diff", return_value=("Summary", 8, "Brief")) as summarize_diff, \
+                patch.object(gptcron, "inner_send_email") as inner_send_email:
+            gptcron.run_cron_checks(force=True)
+        summarize_diff.assert_not_called()
+        inner_send_email.assert_not_called()
+        self.assertEqual(gptcron.get_snapshot_versions("site")[-1][1], latest)
+        self.assertEqual(gptcron.load_metadata()["site"]["validators"], {"etag": '"v2"'})
+
+        # Once the email goes out, the unchanged page is diffed against it.
+        entry["next_attempt"] = 0
+        gptcron.atomic_write_text(gptcron.get_outbox_path("site"), json.dumps(entry))
+        with patch.object(gptcron, "http_get", return_value=response), \
+                patch.object(gptcron, "summarize_diff", return_value=("Summary 2", 8, "Brief")) as summarize_diff, \
+                patch.object(gptcron, "inner_send_email") as inner_send_email:
+            gptcron.run_cron_checks(force=True)
+
+        self.assertEqual(inner_send_email.call_args_list[0].args[1], entry["body"])
+        self.assertEqual(summarize_diff.call_count, 1)
+        self.assertIn("Newer", summarize_diff.call_args.args[0])
+        self.assertNotIn("Old", summarize_diff.call_args.args[0])
+        self.assertEqual(inner_send_email.call_count, 2)
+        metadata = gptcron.load_metadata()["site"]
+        self.assertEqual(metadata["last_emailed_version"], gptcron.get_snapshot_versions("site")[-1][1])
+        self.assertEqual(metadata["validators"], {"etag": '"v3"'})
+        self.assertFalse(gptcron.has_pending_outbox_email("site"))
+
+    def test_outbox_skips_unreadable_entries_and_gives_up_after_max_attempts(self):
+        self.write_config()
+        os.makedirs(gptcron.OUTBOX_DIR, exist_ok=True)
+        gptcron.atomic_write_text(gptcron.get_outbox_path("broken"), "{not json")
+        entry = {
+            "name": "site", "subject": "Subject", "body": "Body", "to_email": "a@example.com",
+            "latest_file": "snapshot", "attempts": gptcron.OUTBOX_MAX_ATTEMPTS - 1, "next_attempt": 0
+        }
+        gptcron.atomic_write_text(gptcron.get_outbox_path("site"), json.dumps(entry))
+
+        with patch.object(gptcron, "inner_send_email", side_effect=gptcron.EmailDeliveryError("SMTP down")), \
+                patch.object(gptcron, "log_message") as log_message:
+            self.assertEqual(gptcron.send_outbox_emails(), (0, 1))
+
+        self.assertTrue(os.path.exists(gptcron.get_outbox_path("broken") + ".bad"))
+        self.assertFalse(gptcron.has_pending_outbox_email("broken"))
+        self.assertFalse(gptcron.has_pending_outbox_email("site"))
+        errors = [call.args[0] for call in log_message.call_args_list if call.kwargs.get("error")]
+        self.assertTrue(any("Giving up on the email for job site" in message for message in errors))
+
     def test_cron_continues_after_email_failure(self):
         jobs = [
             {"frequency": "daily", "name": "bad", "url": "https://bad", "date_added": "0"},
@@ -391,6 +1291,7 @@ class CronAndCliTests(GptCronTestCase):
 
         with patch.object(gptcron, "parse_cron_file", return_value=jobs), \
                 patch.object(gptcron, "get_last_file", return_value=(None, None)), \
+                patch.object(gptcron, "download_url"), \
                 patch.object(
                     gptcron,
                     "run_job",
@@ -400,6 +1301,328 @@ class CronAndCliTests(GptCronTestCase):
 
         self.assertEqual(run_job.call_count, 2)
 
+    def test_cron_fetch_stage_respects_per_host_cap(self):
+        jobs = [
+            {"frequency": "daily", "name": f"job{index}", "url": f"https://{host}/{index}", "date_added": "0"}
+            for index, host in enumerate(["a.test"] * 4 + ["b.test"] * 4)
+        ]
+        active = {}
+        peak = {}
+        lock = threading.Lock()
+
+        def fake_download(url, name, validators=None, previous_hash=None):
+            host = gptcron.get_url_host(url)
+            with lock:
+                active[host] = active.get(host, 0) + 1
+                peak[host] = max(peak.get(host, 0), active[host])
+            time.sleep(0.02)
+            with lock:
+                active[host] -= 1
+            return f"data/{name}/{name}.html", {}, "hash"
+
+        with patch.object(gptcron, "parse_cron_file", return_value=jobs), \
+                patch.object(gptcron, "download_url", side_effect=fake_download), \
+                patch.object(gptcron, "process_downloaded_job", return_value=False) as process:
+            gptcron.run_cron_checks(force=True)
+
+        self.assertEqual(process.call_count, 8)
+        self.assertLessEqual(max(peak.values()), gptcron.FETCH_WORKERS_PER_HOST)
+        processed = [call.args[1] for call in process.call_args_list]
+        self.assertEqual(processed, [f"data/job{index}/job{index}.html" for index in range(8)])
+
+    def test_cron_collects_permanent_fetch_errors_for_batch_email(self):
+        jobs = [
+            {"frequency": "daily", "name": "gone", "url": "https://gone.test", "date_added": "0"},
+            {"frequency": "daily", "name": "fine", "url": "https://fine.test", "date_added": "0"}
+        ]
+        not_found = gptcron.requests.exceptions.HTTPError(
+            response=SimpleNamespace(status_code=404)
+        )
+
+        def fake_download(url, name, validators=None, previous_hash=None):
+            if name == "gone":
+                raise not_found
+            return f"data/{name}/{name}.html", {}, "hash"
+
+        with patch.object(gptcron, "parse_cron_file", return_value=jobs), \
+                patch.object(gptcron, "download_url", side_effect=fake_download), \
+                patch.object(gptcron, "process_downloaded_job", return_value=False), \
+                patch.object(gptcron, "send_batch_error_email") as batch_email:
+            gptcron.run_cron_checks(force=True)
+
+        errors = batch_email.call_args.args[0]
+        self.assertEqual([error["job_name"] for error in errors], ["gone"])
+        self.assertEqual(errors[0]["status_code"], 404)
+
+    def test_cron_cpu_pool_diffs_in_worker_process(self):
+        self.write_config()
+        self.write_job()
+        baseline = self.write_snapshot(
+            "site", "20260101-00-00-00", "<html><body>Old</body></html>"
+        )
+        gptcron.save_metadata({"site": {"last_emailed_version": baseline}})
+
+        def fake_download(url, name, validators=None, previous_hash=None):
+            return self.write_snapshot(name, "20260102-00-00-00", "<html><body>New</body></html>"), {}, "hash"
+
+        with patch.object(gptcron, "download_url", side_effect=fake_download), \
+                patch.object(
+                    gptcron, "summarize_diff", return_value=("Summary", 3, "Brief")
+                ) as summarize_diff, \
+                patch.object(gptcron, "prepare_diff", wraps=gptcron.prepare_diff) as prepare_diff:
+            gptcron.run_cron_checks(force=True, cpu_pool=True)
+
+        self.assertEqual(summarize_diff.call_args.args[0], "REMOVED: Old\r\nADDED: New")
+        prepare_diff.assert_called_once()
+        self.assertIsNone(gptcron._cpu_pool)
+        self.assertEqual(gptcron._prepared_diffs, {})
+
+    def test_cron_cpu_pool_extracts_downloads_in_worker_process(self):
+        self.write_config()
+        self.write_job()
+        baseline = self.write_snapshot(
+            "site", "20260101-00-00-00", "<html><body>Old</body></html>"
+        )
+        gptcron.save_metadata({"site": {"last_emailed_version": baseline}})
+        response = Mock(status_code=200, headers={}, text="<html><body><p>New</p></body></html>")
+
+        with patch.object(gptcron, "http_get", return_value=response), \
+                patch.object(
+                    gptcron, "summarize_diff", return_value=("Summary", 3, "Brief")
+                ) as summarize_diff, \
+                patch.object(
+                    gptcron, "extract_visible_lines_from_html", wraps=gptcron.extract_visible_lines_from_html
+                ) as extract:
+            gptcron.run_cron_checks(force=True, cpu_pool=True)
+
+        extract.assert_not_called()
+        self.assertEqual(summarize_diff.call_args.args[0], "REMOVED: Old\r\nADDED: New")
+        self.assertEqual(
+            gptcron.load_metadata()["site"]["content_hash"], gptcron.hash_visible_lines(["New"])
+        )
+
+    def test_run_report_records_stage_timings_per_job(self):
+        self.write_config()
+        self.write_job()
+        baseline = self.write_snapshot(
+            "site", "20260101-00-00-00", "<html><body>Old</body></html>"
+        )
+        gptcron.save_metadata({"site": {"last_emailed_version": baseline}})
+        response = Mock(status_code=200, headers={}, text="<html><body><p>New</p><p>Line</p></body></html>")
+
+        with patch.object(gptcron, "http_get", return_value=response), \
+                patch.object(gptcron, "summarize_diff", return_value=("Summary", 8, "Brief")), \
+                patch.object(gptcron, "inner_send_email"):
+            gptcron.run_cron_checks(force=True)
+
+        with open(gptcron.RUN_REPORTS_FILE, encoding="utf-8") as reports:
+            report = json.loads(reports.readline())
+        self.assertEqual((report["jobs"], report["changes"], report["emails_sent"]), (1, 1, 1))
+        self.assertEqual(report["lines"], 2)
+        self.assertEqual(report["bytes"], len(response.text))
+        timing = report["slowest"][0]
+        self.assertEqual(timing["job"], "site")
+        self.assertEqual(set(gptcron.TRACE_STAGES) - set(timing), set())
+        self.assertEqual(timing["diff_lines"], 3)
+
+        with patch("sys.stdout", new_callable=io.StringIO) as output:
+            gptcron.show_run_report()
+        self.assertIn("1 of 1 job(s) checked, 1 change(s)", output.getvalue())
+        self.assertIn("site", output.getvalue())
+
+    def test_name_lookup_download_is_not_timed_as_a_job(self):
+        response = Mock(status_code=200, headers={}, text="<html><body>Example page</body></html>")
+
+        with patch.object(gptcron, "http_get", return_value=response), \
+                patch.object(gptcron, "gpt_generate_job_names", return_value="example-page"):
+            self.assertEqual(gptcron.get_gpt_name("https://example.com"), "example-page")
+
+        self.assertEqual(gptcron._job_timings, {})
+
+    def test_weekly_summary_goes_through_batch_api_and_finishes_next_run(self):
+        submitted = []
+        answer = '{"summary": "Batched summary", "brief summary": "Brief", "score": 8}'
+
+        class BatchStub(http.server.BaseHTTPRequestHandler):
+            # Just enough of the OpenAI files/batches endpoints for one batch.
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers["Content-Length"])).decode("utf-8")
+                if self.path == "/v1/files":
+                    submitted.extend(
+                        json.loads(line) for line in body.splitlines() if line.startswith('{"custom_id"')
+                    )
+                    self.reply({"id": "file-in", "object": "file", "bytes": len(body), "created_at": 0,
+                                "filename": "batch.jsonl", "purpose": "batch", "status": "processed"})
+                else:
+                    self.reply(self.batch("validating"))
+
+            def do_GET(self):
+                if self.path == "/v1/batches/batch_1":
+                    self.reply(self.batch("completed", output_file_id="file-out"))
+                else:
+                    lines = [json.dumps({
+                        "id": "response", "custom_id": request["custom_id"], "error": None,
+                        "response": {"status_code": 200, "request_id": "r", "body": {
+                            "id": "c", "object": "chat.completion", "created": 0, "model": "gpt-test",
+                            "choices": [{"index": 0, "finish_reason": "stop",
+                                         "message": {"role": "assistant", "content": answer}}]
+                        }}
+                    }) for request in submitted]
+                    self.reply("\n".join(lines))
+
+            def batch(self, status, **fields):
+                return dict({"id": "batch_1", "object": "batch", "endpoint": "/v1/chat/completions",
+                             "input_file_id": "file-in", "completion_window": "24h",
+                             "status": status, "created_at": 0}, **fields)
+
+            def reply(self, payload):
+                body = (payload if isinstance(payload, str) else json.dumps(payload)).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), BatchStub)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+
+        self.write_config(default_model="gpt-test", fallback_model=None, llm_batch=True)
+        self.write_job(frequency="weekly")
+        baseline = self.write_snapshot("site", "20260101-00-00-00", "<html><body>Old</body></html>")
+        gptcron.save_metadata({"site": {"last_emailed_version": baseline}})
+        latest = []
+
+        def fake_download(url, name, validators=None, previous_hash=None):
+            latest.append(self.write_snapshot(name, "20260102-00-00-00", "<html><body>New</body></html>"))
+            return latest[0], {}, "hash"
+
+        with patch.dict(os.environ, {"OPENAI_BASE_URL": f"http://127.0.0.1:{server.server_address[1]}/v1"}), \
+                patch.object(gptcron, "download_url", side_effect=fake_download), \
+                patch.object(gptcron, "send_email") as send_email:
+            gptcron.run_cron_checks()
+            send_email.assert_not_called()
+            self.assertEqual(len(submitted), 1)
+            self.assertEqual(submitted[0]["body"]["response_format"], {"type": "json_object"})
+            self.assertTrue(gptcron.has_pending_batch_summary("site"))
+
+            # Not due again, but the next tick collects the finished batch.
+            gptcron.run_cron_checks()
+
+        self.assertEqual(send_email.call_count, 1)
+        self.assertIn("Batched summary", send_email.call_args.args[2])
+        self.assertEqual(gptcron.load_metadata()["site"]["last_emailed_version"], latest[0])
+        self.assertFalse(gptcron.has_pending_batch_summary("site"))
+        self.assertEqual(os.listdir(gptcron.LLM_BATCH_DIR), ["queued"])
+
+    def test_anthropic_batch_defers_later_changes_until_collected(self):
+        answer = '{"summary": "Batched summary", "brief summary": "Brief", "score": 8}'
+        client = Mock()
+        client.messages.batches.create.return_value = SimpleNamespace(id="msgbatch_1")
+        anthropic_module = SimpleNamespace(Anthropic=Mock(return_value=client))
+        self.write_config(llm_batch=True)
+        self.write_job(frequency="weekly")
+        baseline = self.write_snapshot("site", "20260101-00-00-00", "<html><body>Old</body></html>")
+        gptcron.save_metadata({"site": {"last_emailed_version": baseline}})
+        response = Mock(status_code=200, headers={"ETag": '"v1"'}, text="<html><body>New</body></html>")
+
+        def run(processing_status, results=()):
+            client.messages.batches.retrieve.return_value = SimpleNamespace(processing_status=processing_status)
+            client.messages.batches.results.return_value = list(results)
+            with patch.object(gptcron, "http_get", return_value=response), \
+                    patch.object(gptcron, "inner_send_email") as inner_send_email, \
+                    patch.object(gptcron, "log_message") as log_message:
+                gptcron.run_cron_checks(force=True)
+            summary = [call.args[0] for call in log_message.call_args_list if "Checked cron jobs" in call.args[0]]
+            return inner_send_email, summary[0]
+
+        with patch.object(gptcron, "ANTHROPIC_AVAILABLE", True), \
+                patch.object(gptcron, "anthropic", anthropic_module):
+            run("in_progress")
+            batched = gptcron.get_snapshot_versions("site")[-1][1]
+            request = client.messages.batches.create.call_args.kwargs["requests"][0]
+            self.assertEqual(request["params"]["system"][0]["cache_control"], {"type": "ephemeral"})
+            self.assertIn("ADDED: New", request["params"]["messages"][0]["content"])
+
+            # A change while the batch runs is not diffed, and its snapshot is dropped.
+            response.text = "<html><body>Newer</body></html>"
+            response.headers = {"ETag": '"v2"'}
+            run("in_progress")
+            self.assertEqual(gptcron.get_snapshot_versions("site")[-1][1], batched)
+            self.assertEqual(gptcron.load_metadata()["site"]["validators"], {"etag": '"v1"'})
+            self.assertEqual(client.messages.batches.create.call_count, 1)
+
+            finished = SimpleNamespace(custom_id=request["custom_id"], result=SimpleNamespace(
+                type="succeeded", message=SimpleNamespace(content=[SimpleNamespace(text=answer)])
+            ))
+            inner_send_email, summary = run("ended", [finished])
+            self.assertIn("Batched summary", inner_send_email.call_args_list[0].args[1])
+            self.assertIn("Emails Sent: 1, Emails Failed: 0", summary)
+            self.assertEqual(gptcron.load_metadata()["site"]["last_emailed_version"], batched)
+
+        # The page still shows the deferred change, which is now diffed against the emailed snapshot.
+        second = client.messages.batches.create.call_args.kwargs["requests"][0]
+        self.assertEqual(client.messages.batches.create.call_count, 2)
+        self.assertIn("REMOVED: New\r\nADDED: Newer", second["params"]["messages"][0]["content"])
+
+    def test_missing_batch_result_forces_a_full_recheck(self):
+        self.write_config()
+        gptcron.save_metadata({"site": {"validators": {"etag": '"v1"'}, "content_hash": "hash"}})
+        request = {"custom_id": "diff-1", "name": "site"}
+        gptcron.atomic_write_text(
+            os.path.join(gptcron.LLM_BATCH_DIR, "batch_1.json"),
+            json.dumps({"provider": "openai", "batch_id": "batch_1", "requests": [request]})
+        )
+
+        with patch.object(gptcron, "fetch_batch_results", return_value={}):
+            self.assertEqual(gptcron.collect_llm_batches(), (0, 0))
+
+        self.assertEqual(gptcron.load_metadata()["site"], {})
+        self.assertEqual(gptcron.list_json_files(gptcron.LLM_BATCH_DIR), [])
+
+    def test_schedule_orders_jobs_by_next_due_time(self):
+        jobs = [
+            {"frequency": "daily", "name": "daily-site", "url": "https://a", "date_added": "0"},
+            {"frequency": "hourly", "name": "hourly-site", "url": "https://b", "date_added": "0"},
+            {"frequency": "daily", "name": "checked-site", "url": "https://c", "date_added": "0"}
+        ]
+        metadata = {"checked-site": {"last_checked": 1000}}
+
+        with patch.object(gptcron, "get_last_file", return_value=(None, None)):
+            schedule = gptcron.build_schedule(jobs, metadata)
+
+        order = [gptcron.heapq.heappop(schedule)[:2] for _ in range(len(jobs))]
+        self.assertEqual(order, [(3600, "hourly-site"), (86400, "daily-site"), (87400, "checked-site")])
+
+    def test_daemon_runs_due_jobs_and_backs_off_failures(self):
+        self.write_job(name="site", frequency="hourly")
+        stop_event = threading.Event()
+        batches = []
+        waits = []
+
+        def fake_run_due_jobs(due_jobs, total_jobs, metadata, cpu_pool=False):
+            batches.append([job["name"] for job in due_jobs])
+
+        def fake_wait(timeout):
+            waits.append(timeout)
+            stop_event.set()
+
+        with patch.object(gptcron, "get_last_file", return_value=(None, None)), \
+                patch.object(gptcron, "run_due_jobs", side_effect=fake_run_due_jobs), \
+                patch.object(stop_event, "wait", side_effect=fake_wait):
+            gptcron.run_scheduler(stop_event)
+
+        # Nothing was recorded for the job, so it is retried after the backoff
+        # rather than immediately.
+        self.assertEqual(batches, [["site"]])
+        self.assertEqual(len(waits), 1)
+        self.assertGreater(waits[0], 0)
+        self.assertLessEqual(waits[0], gptcron.DAEMON_POLL_SECONDS)
+
     def test_parse_cron_skips_invalid_frequency_and_unsafe_name(self):
         with open(".gptcron", "w", encoding="utf-8") as cron_file:
             cron_file.write("sometimes site https://example.com 20260101000000\n")
@@ -466,6 +1689,7 @@ class CronAndCliTests(GptCronTestCase):
         args = parser.parse_args(["check_cron", "force"])
 
         self.assertEqual(args.force, "force")
+        self.assertFalse(args.cpu_pool)
 
     def test_wiki_email_mode_uses_live_url_and_email_function(self):
         self.write_config()